@@ -0,0 +1,47 @@
+"""add team indexes
+
+Revision ID: 5a1f3c2d9e4b
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Optional
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1f3c2d9e4b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_player_team_player_id', 'player', ['team', 'player_id']),
+    ('ix_player_team_substitute', 'player', ['team', 'substitute']),
+    ('ix_botmessage_team', 'botmessage', ['team']),
+]
+
+
+def existing_indexes(table: str) -> Optional[set]:
+    inspector = sa.inspect(op.get_bind())
+    if table not in inspector.get_table_names():
+        # Fresh databases get their tables (and these indexes) from create_all when the bot starts
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    # Databases created after these indexes were added to the models already have them from create_all
+    for name, table, columns in INDEXES:
+        indexes = existing_indexes(table)
+        if indexes is not None and name not in indexes:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        if name in (existing_indexes(table) or ()):
+            op.drop_index(name, table_name=table)
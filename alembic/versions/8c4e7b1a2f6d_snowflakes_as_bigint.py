@@ -0,0 +1,65 @@
+"""store discord snowflakes as bigint
+
+Revision ID: 8c4e7b1a2f6d
+Revises: 5a1f3c2d9e4b
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e7b1a2f6d'
+down_revision = '5a1f3c2d9e4b'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = {
+    'player': ['player_id'],
+    'botmessage': ['message_id'],
+    'team': [
+        'role', 'role_secondary', 'author_id', 'invite_channel_id',
+        'invite_message_id', 'team_channel_id', 'team_message_id'
+    ],
+    'raidsstate': ['time_to_next_message'],
+    'amigosecreto': ['discord_id'],
+    'sos_state': ['message_id'],
+}
+
+
+def existing_tables() -> dict:
+    """Only the tables that exist, fresh databases get them from create_all when the bot starts"""
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    return {table: columns for table, columns in COLUMNS.items() if table in tables}
+
+
+def upgrade():
+    tables = existing_tables()
+    # Empty strings can't be cast, they never held a valid ID anyway
+    for table, columns in tables.items():
+        for column in columns:
+            op.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+
+    for table, columns in tables.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.String(),
+                    type_=sa.BigInteger(),
+                    postgresql_using=f'{column}::bigint'
+                )
+
+
+def downgrade():
+    for table, columns in existing_tables().items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.BigInteger(),
+                    type_=sa.String(),
+                    postgresql_using=f'{column}::varchar'
+                )
@@ -0,0 +1,30 @@
+"""add the merchant stock message state
+
+Revision ID: a6c3f9e2d1b5
+Revises: f4b8d1e7a9c2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3f9e2d1b5'
+down_revision = 'f4b8d1e7a9c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'merchant_state' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'merchant_state',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('message_id', sa.BigInteger(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('merchant_state')
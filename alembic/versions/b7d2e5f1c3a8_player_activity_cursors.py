@@ -0,0 +1,46 @@
+"""replace playeractivities with per-player cursors
+
+Revision ID: b7d2e5f1c3a8
+Revises: 8c4e7b1a2f6d
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e5f1c3a8'
+down_revision = '8c4e7b1a2f6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'playeractivitycursor' not in tables:
+        op.create_table(
+            'playeractivitycursor',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('player', sa.String(), nullable=True),
+            sa.Column('last_date', sa.DateTime(), nullable=True),
+            sa.Column('recent_ids', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('player')
+        )
+    # Old rows only hold the entry IDs, without the player or the publish date, so they can't be turned
+    # into cursors. Players without a cursor have their current feed taken as a baseline instead, which
+    # avoids re-sending their whole log.
+    if 'playeractivities' in tables:
+        op.drop_table('playeractivities')
+
+
+def downgrade():
+    op.create_table(
+        'playeractivities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activities_id', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('activities_id')
+    )
+    op.drop_table('playeractivitycursor')
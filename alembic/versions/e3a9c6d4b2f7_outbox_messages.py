@@ -0,0 +1,33 @@
+"""add outbox for messages produced by the background worker
+
+Revision ID: e3a9c6d4b2f7
+Revises: b7d2e5f1c3a8
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c6d4b2f7'
+down_revision = 'b7d2e5f1c3a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'outboxmessage' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'outboxmessage',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('channel_id', sa.BigInteger(), nullable=True),
+            sa.Column('sender', sa.String(), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('outboxmessage')
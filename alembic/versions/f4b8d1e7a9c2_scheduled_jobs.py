@@ -0,0 +1,32 @@
+"""add last run times of the scheduler's jobs
+
+Revision ID: f4b8d1e7a9c2
+Revises: e3a9c6d4b2f7
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d1e7a9c2'
+down_revision = 'e3a9c6d4b2f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'scheduledjob' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'scheduledjob',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('last_run', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('scheduledjob')
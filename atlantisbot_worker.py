@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+
+import colorama
+
+from bot.worker_client import Worker
+
+
+if __name__ == '__main__':
+    colorama.init()
+    logging.basicConfig(
+        filename='worker.log',
+        level=logging.INFO,
+        format='%(asctime)s:%(levelname)s:%(name)s: %(message)s'
+    )
+    loop = asyncio.get_event_loop()
+    worker = Worker()
+    if not worker.enabled_extensions():
+        print(f"{colorama.Fore.YELLOW}No extensions to run. Set 'worker_extensions' in '/bot/bot_settings.json'.")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        print(f"{colorama.Fore.RED}KeyBoardInterrupt. Stopping worker...")
+        loop.run_until_complete(worker.close())
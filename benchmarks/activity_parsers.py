@@ -0,0 +1,44 @@
+"""
+Entries per second and memory allocated when parsing an Adventurer's log with each ActivitySource, on the
+saved fixtures in benchmarks/fixtures (20 entries each, like the feeds the adv log polls)
+
+Usage: python -m benchmarks.activity_parsers
+"""
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from bot.utils.activities import SOURCES
+
+
+FIXTURES = {
+    'rss': Path(__file__).parent / 'fixtures' / 'adventurers_log.xml',
+    'runemetrics': Path(__file__).parent / 'fixtures' / 'runemetrics_profile.json',
+}
+
+
+def main():
+    parsed = {name: SOURCES[name].parse(path.read_bytes()) for name, path in FIXTURES.items()}
+    # Both fixtures hold the same log, so both sources end up as the same embeds
+    assert len({tuple((activity.title, activity.description) for activity in activities)
+                for activities in parsed.values()}) == 1
+
+    for name, path in FIXTURES.items():
+        content = path.read_bytes()
+        parse = SOURCES[name].parse
+        entries = len(parsed[name])
+
+        runs = 200
+        best = min(timeit.repeat(lambda: parse(content), number=runs, repeat=5))
+
+        tracemalloc.start()
+        parse(content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{name}: {entries * runs / best:,.0f} entradas/s, "
+              f"{best / runs * 1000:.2f}ms por feed, pico de {peak / 1024:.0f} KB alocados por feed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Messages per second classified by the MessageRouter, compared with the checks Bot.on_message used to run
+
+Usage: python -m benchmarks.router
+"""
+import random
+import re
+import timeit
+
+from bot import settings
+from bot.utils.router import MessageRouter
+
+
+CHAT = [
+    "alguém vai fazer raids hoje?",
+    "gzzz",
+    "boa noite galera",
+    "quanto ta o preço do elder rune bar no GE?",
+    "alguem sabe onde fica o portal da prifddinas",
+    "acabei de pegar 99 em mineração!!!",
+    "to afk uns 10 minutos, já volto",
+    "vlw pela ajuda ontem, consegui terminar a quest",
+    "kkkkkkkk",
+    "bora fazer um boss de clã sábado às 20h?",
+]
+COMMANDS = ["!claninfo NRiver", "!ranks", "!merchant", "!raids", "!comp", "!help"]
+TEAMS = ["in 12", "out 12", "in raids", "OUT raids", "in 3"]
+WIKI = [
+    "olha aqui https://runescape.fandom.com/wiki/Elder_rune_bar",
+    "guia: https://runescape.fandom.com/wiki/Araxxor/Strategies e https://runescape.fandom.com/wiki/Telos",
+]
+
+
+def corpus(size: int, membro: int, convidado: int):
+    """Mostly chat, then commands and team messages, a few wiki links and rare mentions"""
+    mentions = ["@everyone alguém online?", f"<@&{membro}> evento começando", f"<@&{convidado}> bem-vindos"]
+    rng = random.Random(2)
+    kinds = [(CHAT, 80), (COMMANDS, 10), (TEAMS, 6), (WIKI, 3), (mentions, 1)]
+    population = [messages for messages, weight in kinds for _ in range(weight)]
+    return [rng.choice(rng.choice(population)) for _ in range(size)]
+
+
+def legacy_classify(content: str, membro: int, convidado: int):
+    """The checks Bot.on_message ran on every message before the MessageRouter"""
+    unauthorized_mentions = ['@everyone', '@here', f"<@&{membro}>", f"<@&{convidado}>"]
+    mention = any(mention in content for mention in unauthorized_mentions)
+    formatted_urls = []
+    if 'http' in content and 'runescape.fandom.com/wiki' in content:
+        for url in re.findall(r"http\S+", content):
+            if 'runescape.fandom.com/wiki' in url:
+                formatted_urls.append(url.replace('runescape.fandom.com/wiki/', 'rs.wiki/w/'))
+    team = None
+    team_join = re.search(r'(^in |^out )\d+|(^in raids)|(^out raids)', content, flags=re.IGNORECASE)
+    if team_join:
+        team_join = team_join.group()
+        team_id = ''.join(re.findall(r'\d+|raids', team_join, flags=re.IGNORECASE)).lower()
+        team = (team_id, 'join' if 'in' in team_join.lower() else 'leave')
+    return mention, tuple(formatted_urls), team
+
+
+def main():
+    snapshot = settings.Snapshot.from_data(settings.default_settings, 0)
+    membro, convidado = snapshot.role.get('membro'), snapshot.role.get('convidado')
+    router = MessageRouter(snapshot)
+    messages = corpus(20000, membro, convidado)
+
+    for content in messages:
+        route = router.classify(content)
+        assert (route.mention, route.wiki_urls, route.team) == legacy_classify(content, membro, convidado), content
+
+    for name, classify in (('on_message (antes)', lambda content: legacy_classify(content, membro, convidado)),
+                           ('MessageRouter', router.classify)):
+        best = min(timeit.repeat(lambda: [classify(content) for content in messages], number=1, repeat=5))
+        print(f"{name}: {len(messages) / best:,.0f} mensagens/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Query plans and latencies of the team queries (bot/utils/teams.py) with and without the indexes added by
+the 5a1f3c2d9e4b migration, on a SQLite database seeded with realistic row counts
+
+Usage: python -m benchmarks.team_indexes
+"""
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from bot.orm.models import Base, Team, Player, BotMessage
+
+
+TEAMS = 1000
+PLAYERS_PER_TEAM = 10
+MESSAGES_PER_TEAM = 30
+INDEXES = ['ix_player_team_player_id', 'ix_player_team_substitute', 'ix_botmessage_team']
+
+# The same queries bot/utils/teams.py runs, keyed by where they're run
+QUERIES = {
+    'Roster.load': lambda session, team: (
+        session.query(Team).options(joinedload(Team.players)).filter_by(team_id=team.team_id)),
+    'delete_team (BotMessages)': lambda session, team: (
+        session.query(BotMessage.message_id).filter_by(team=team.id)),
+    'delete_team (cascade)': lambda session, team: session.query(Player).filter_by(team=team.id),
+}
+
+
+def seed(session) -> None:
+    rng = random.Random(6)
+    teams = [Team(team_id=str(n), title=f"Time {n}", size=PLAYERS_PER_TEAM) for n in range(TEAMS)]
+    session.add_all(teams)
+    session.flush()
+    session.bulk_insert_mappings(Player, [
+        {'player_id': rng.getrandbits(60), 'team': team.id, 'substitute': n >= PLAYERS_PER_TEAM - 2}
+        for team in teams for n in range(PLAYERS_PER_TEAM)
+    ])
+    session.bulk_insert_mappings(BotMessage, [
+        {'message_id': rng.getrandbits(60), 'team': team.id} for team in teams for _ in range(MESSAGES_PER_TEAM)
+    ])
+    session.commit()
+
+
+def sql(engine, query) -> str:
+    return str(query.statement.compile(engine, compile_kwargs={'literal_binds': True}))
+
+
+def run(session, engine, label: str) -> None:
+    print(f"[ {label} ]")
+    teams = session.query(Team).all()
+    rng = random.Random(6)
+    for name, query in QUERIES.items():
+        plan = engine.execute(text(f"EXPLAIN QUERY PLAN {sql(engine, query(session, teams[0]))}")).fetchall()
+        timings = []
+        # Only the SQL is timed, loading the rows into objects takes the same time with or without the indexes
+        for team in rng.sample(teams, 200):
+            statement = text(sql(engine, query(session, team)))
+            start = time.perf_counter()
+            engine.execute(statement).fetchall()
+            timings.append(time.perf_counter() - start)
+        print(f"{name}: {statistics.median(timings) * 1000:.3f}ms (mediana)")
+        for row in plan:
+            print(f"    {row[-1]}")
+
+
+def main():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    seed(session)
+    print(f"{TEAMS} times, {TEAMS * PLAYERS_PER_TEAM} jogadores, {TEAMS * MESSAGES_PER_TEAM} mensagens\n")
+
+    for index in INDEXES:
+        engine.execute(text(f"DROP INDEX {index}"))
+    run(session, engine, 'Sem os índices')
+    print()
+    for index in Base.metadata.tables['player'].indexes | Base.metadata.tables['botmessage'].indexes:
+        if index.name in INDEXES:
+            index.create(bind=engine)
+    run(session, engine, 'Com os índices')
+
+
+if __name__ == '__main__':
+    main()
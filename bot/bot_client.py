@@ -1,8 +1,8 @@
 import asyncio
+import collections
 import logging
 import datetime
 import os
-import re
 import sys
 import json
 from pathlib import Path
@@ -18,7 +18,38 @@ from bot import settings
 from bot.orm import db
 from bot.orm.models import DisabledCommand
 from bot.utils.tools import separator, has_any_role
-from bot.utils.teams import manage_team, TeamNotFoundError, WrongChannelError
+from bot.utils.teams import TeamManager, TeamNotFoundError, WrongChannelError
+from bot.utils.router import MessageRouter
+from bot.utils.clans import ClanRosterCache
+from bot.utils.http import HttpClient
+from bot.utils.webhooks import WebhookPoster
+from bot.utils.state import BotState
+from bot.utils.scheduler import Scheduler
+from bot.utils.live_message import LiveMessages
+
+
+class LoopLag:
+    """Keeps the latest, maximum and average lag of the event loop, in seconds"""
+
+    def __init__(self, window: int = 60):
+        self.samples = collections.deque(maxlen=window)
+        self.max = 0.0
+
+    def add(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.samples.append(lag)
+        self.max = max(self.max, lag)
+
+    @property
+    def last(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    @property
+    def average(self) -> float:
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def __str__(self):
+        return f"{self.last * 1000:.1f}ms (média {self.average * 1000:.1f}ms, máx. {self.max * 1000:.1f}ms)"
 
 
 class Bot(commands.Bot):
@@ -32,8 +63,25 @@ class Bot(commands.Bot):
         self.remove_command('help')
         self.start_time = None
         self.app_info = None
+        self.team_manager = TeamManager(self)
+        self.loop_lag = LoopLag()
+        self.http_client = HttpClient()
+        self.clan_rosters = ClanRosterCache(self.http_client, ttl=self.setting.clan_roster_ttl)
+        self.live_messages = LiveMessages()
+        # Loaded before the event loop starts, so blocking on the database here is fine
+        self.state = BotState()
+        self.scheduler = Scheduler(self)
+        with self.db_session() as session:
+            self.state.load(session)
+            self.scheduler.load(session)
         self.loop.create_task(self.track_start())
+        self.loop.create_task(self.track_loop_lag())
         self.loop.create_task(self.load_all_extensions())
+        self.loop.create_task(self.scheduler.run())
+
+    async def close(self):
+        await self.http_client.close()
+        await super().close()
 
     async def send_logs(self, e, tb, ctx: commands.Context = None):
         dev = self.get_user(self.setting.developer_id)
@@ -54,22 +102,22 @@ class Bot(commands.Bot):
             except Exception:
                 await dev.send("Erro ao tentar enviar logs.")
 
+    _setting: settings.Settings = None
+    _router: MessageRouter = None
+
     @property
-    def setting(self):
-        try:
-            with open('bot/bot_settings.json', 'r'):
-                return settings.Settings()
-        except FileNotFoundError:
-            with open('bot/bot_settings.json', 'w') as f:
+    def setting(self) -> settings.Settings:
+        if self._setting:
+            return self._setting
+        if not os.path.exists(settings.SETTINGS_PATH):
+            with open(settings.SETTINGS_PATH, 'w') as f:
                 json.dump(settings.default_settings, f, indent=4)
-                if not os.environ.get('ATLBOT_TOKEN'):
-                    print(f"{colorama.Fore.YELLOW}Settings not found. Default settings file created. "
-                          "Edit '/bot/bot_settings.json' to change settings, then reload the bot.")
-                    sys.exit(1)
-                else:
-                    with open('bot/bot_settings.json', 'w') as heroku_settings:
-                        json.dump(settings.default_settings, heroku_settings, indent=4)
-                        return settings.Settings()
+            if not os.environ.get('ATLBOT_TOKEN'):
+                print(f"{colorama.Fore.YELLOW}Settings not found. Default settings file created. "
+                      "Edit '/bot/bot_settings.json' to change settings, then reload the bot.")
+                sys.exit(1)
+        self._setting = settings.Settings()
+        return self._setting
 
     async def track_start(self):
         """
@@ -80,6 +128,17 @@ class Bot(commands.Bot):
         await asyncio.sleep(1)
         self.start_time = datetime.datetime.utcnow()
 
+    async def track_loop_lag(self, interval: float = 1.0):
+        """
+        Measures how late the event loop wakes up from a sleep of 'interval' seconds
+
+        Anything blocking the loop (synchronous database or HTTP calls, heavy parsing) shows up as lag here.
+        """
+        while not self.is_closed():
+            start = self.loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.add(self.loop.time() - start - interval)
+
     @staticmethod
     def get_cogs():
         """Gets cog names from /cogs/ folder"""
@@ -90,18 +149,25 @@ class Bot(commands.Bot):
                 cogs.remove(cog)
         return cogs
 
+    def enabled_extensions(self):
+        """Cogs run by this process, leaving out the disabled ones and the ones run by the background worker"""
+        skipped = set(self.setting.disabled_extensions) | set(self.setting.worker_extensions)
+        if not self.setting.worker_extensions:
+            # Without a background worker nothing is ever left in the outbox
+            skipped.add('outbox')
+        return [cog for cog in self.get_cogs() if cog not in skipped]
+
     async def unload_all_extensions(self):
         """Unloads all cog extensions"""
         errored = False
-        for extension in self.get_cogs():
-            if extension not in self.setting.disabled_extensions:
-                try:
-                    self.unload_extension(f'bot.cogs.{extension}')
-                    print(f'- Unloaded extension {extension}')
-                except Exception as e:
-                    error = f'{extension}:\n {type(e).__name__} : {e}'
-                    print(f'Failed to unload extension {error}')
-                    errored = True
+        for extension in self.enabled_extensions():
+            try:
+                self.unload_extension(f'bot.cogs.{extension}')
+                print(f'- Unloaded extension {extension}')
+            except Exception as e:
+                error = f'{extension}:\n {type(e).__name__} : {e}'
+                print(f'Failed to unload extension {error}')
+                errored = True
         return errored
 
     async def load_all_extensions(self):
@@ -109,15 +175,14 @@ class Bot(commands.Bot):
         await self.wait_until_ready()
         await asyncio.sleep(1)  # ensure that on_ready has completed and finished printing
         errored = False
-        for extension in self.get_cogs():
-            if extension not in self.setting.disabled_extensions:
-                try:
-                    self.load_extension(f'bot.cogs.{extension}')
-                    print(f'- loaded Extension: {extension}')
-                except Exception as e:
-                    error = f'{extension}:\n {type(e).__name__} : {e}'
-                    print(f'Failed to load extension {error}')
-                    errored = True
+        for extension in self.enabled_extensions():
+            try:
+                self.load_extension(f'bot.cogs.{extension}')
+                print(f'- loaded Extension: {extension}')
+            except Exception as e:
+                error = f'{extension}:\n {type(e).__name__} : {e}'
+                print(f'Failed to load extension {error}')
+                errored = True
         print('-' * 10)
         self.disabled_commands()
         return errored
@@ -127,15 +192,14 @@ class Bot(commands.Bot):
         await self.wait_until_ready()
         await asyncio.sleep(1)  # ensure that on_ready has completed and finished printing
         errored = False
-        for extension in self.get_cogs():
-            if extension not in self.setting.disabled_extensions:
-                try:
-                    self.reload_extension(f'bot.cogs.{extension}')
-                    print(f'- reloaded Extension: {extension}')
-                except Exception as e:
-                    error = f'{extension}:\n {type(e).__name__} : {e}'
-                    print(f'Failed to reload extension {error}')
-                    errored = True
+        for extension in self.enabled_extensions():
+            try:
+                self.reload_extension(f'bot.cogs.{extension}')
+                print(f'- reloaded Extension: {extension}')
+            except Exception as e:
+                error = f'{extension}:\n {type(e).__name__} : {e}'
+                print(f'Failed to reload extension {error}')
+                errored = True
         print('-' * 10)
         return errored
 
@@ -167,14 +231,23 @@ class Bot(commands.Bot):
               f"- Commands prefix: '{self.setting.prefix}'\n"
               f"- Show titles on claninfo: '{self.setting.show_titles}'")
 
+    @property
+    def router(self) -> MessageRouter:
+        """Message router built from the current settings, rebuilt only when the settings are reloaded"""
+        snapshot = self.setting.snapshot
+        if not self._router or self._router.snapshot is not snapshot:
+            self._router = MessageRouter(snapshot)
+        return self._router
+
     async def on_message(self, message: discord.Message):
         """
         This event triggers on every message received by the bot. Including one's that it sent itself.
         If you wish to have multiple event listeners they can be added in other cogs. All on_message listeners should
         always ignore bots.
         """
+        setting = self.setting.snapshot
         if message.author.bot:
-            if self.setting.mode == 'prod':
+            if setting.mode == 'prod':
                 if message.content == 'HECK YES!':
                     return await message.channel.send('HECK NO!')
                 if self.user.mention in message.content:
@@ -182,86 +255,81 @@ class Bot(commands.Bot):
             return
 
         # If in development environment only accept answers in dev server and channel
-        if self.setting.mode == 'dev':
+        if setting.mode == 'dev':
             if not message.guild:
-                if message.author.id != self.setting.developer_id:
+                if message.author.id != setting.developer_id:
                     return
-            elif message.guild.id != self.setting.dev_guild and message.channel.id != 488106800655106058:
+            elif message.guild.id != setting.dev_guild and message.channel.id != 488106800655106058:
                 return
 
-        membro = self.setting.role.get('membro')
-        convidado = self.setting.role.get('convidado')
-        unauthorized_mentions = ['@everyone', '@here', f"<@&{membro}>", f"<@&{convidado}>"]
-        if any(mention in message.content for mention in unauthorized_mentions):
-            if has_any_role(message.author, membro, convidado):
-                embed = discord.Embed(
-                    title="__Ei__",
-                    description=separator,
-                    color=discord.Color.dark_red(),
-                )
-                embed.add_field(
-                    name=f"Por favor não utilize as seguintes menções sem permissão para tal:",
-                    value=f"<@&{membro}> - <@&{convidado}> - @everyone - @here",
-                    inline=False
-                )
-                embed.set_author(
-                    name="Administração",
-                    icon_url="http://www.runeclan.com/images/ranks/1.png"
-                )
-                embed.set_thumbnail(
-                    url=f"http://services.runescape.com/m=avatar-rs/{self.setting.clan_name}/clanmotif.png"
-                )
-                embed.set_footer(
-                    text="Nosso servidor abriga uma quantidade muito grande de pessoas, "
-                         "tenha bom senso ao utilizar uma menção que irá notificar centenas de pessoas."
-                )
-                print(f'> {message.author} used a not allowed mention '
-                      f'in channel #{message.channel} at {datetime.datetime.now()}')
-                print(f"Content:\n<\n{message.content}\n>")
-                await message.delete()
-                return await message.channel.send(content=message.author.mention, embed=embed)
-
-        # Replace old Rs Wikia links to the new Rs Wiki links
-        if 'http' in message.content and 'runescape.fandom.com/wiki' in message.content:
-            urls = re.findall(r"http\S+", message.content)
-            formatted_urls = []
-            for url in urls:
-                if 'runescape.fandom.com/wiki' in url:
-                    url = url.replace('runescape.fandom.com/wiki/', 'rs.wiki/w/')
-                    formatted_urls.append(url)
-
-            formatted_urls_string = ''
-            for url in formatted_urls:
-                formatted_urls_string += f'- ***<{url}>***\n'
-
-            plural = 's' if len(formatted_urls) > 1 else ''
-            await message.channel.send(
-                f'Olá, parece que você usou um ou mais links para a antiga Wiki do RuneScape!'
-                f'\n\n'
-                f'A wiki antiga não é mais suportada e está muito desatualizada. '
-                f'Ao invés do{plural} link{plural} que você enviou, utilize o{plural} link{plural} abaixo:\n\n'
-                f'{formatted_urls_string}')
-        # Checks for 'in {number}' or 'out {number}' in message, for team join/leave commands (case-insensitive)
-        team_join = re.search(r'(^in |^out )\d+|(^in raids)|(^out raids)', message.content, flags=re.IGNORECASE)
-        if team_join:
-            team_join = team_join.group()
-            team_id = re.findall(r'\d+|raids', team_join, flags=re.IGNORECASE)
-            team_id = ''.join(team_id).lower()
-            mode = 'join' if 'in' in team_join.lower() else 'leave'
-            try:
-                await manage_team(team_id=team_id, client=self, message=message, mode=mode)
-                return
-            except TeamNotFoundError:
-                return await message.channel.send(f"Time com ID '{team_id}' não existe.")
-            except WrongChannelError:
-                return await message.channel.send(f"Você não pode entrar nesse time por esse canal.")
-            except Exception as e:
-                msg = 'entrar em' if mode == 'join' else 'sair de'
-                return await message.channel.send(
-                    f"Erro inesperado ao tentar {msg} time. Favor reportar o erro para @NRiver#2263: {e}"
-                )
+        router = self.router
+        route = router.classify(message.content)
+        if route.mention and has_any_role(message.author, router.membro, router.convidado):
+            return await self.unauthorized_mention(message, router.membro, router.convidado)
+        if route.wiki_urls:
+            await self.rewrite_wiki_urls(message, route.wiki_urls)
+        if route.team:
+            team_id, mode = route.team
+            return await self.join_or_leave_team(message, team_id, mode)
         await self.process_commands(message)
 
+    async def unauthorized_mention(self, message: discord.Message, membro: int, convidado: int):
+        embed = discord.Embed(
+            title="__Ei__",
+            description=separator,
+            color=discord.Color.dark_red(),
+        )
+        embed.add_field(
+            name=f"Por favor não utilize as seguintes menções sem permissão para tal:",
+            value=f"<@&{membro}> - <@&{convidado}> - @everyone - @here",
+            inline=False
+        )
+        embed.set_author(
+            name="Administração",
+            icon_url="http://www.runeclan.com/images/ranks/1.png"
+        )
+        embed.set_thumbnail(
+            url=f"http://services.runescape.com/m=avatar-rs/{self.setting.clan_name}/clanmotif.png"
+        )
+        embed.set_footer(
+            text="Nosso servidor abriga uma quantidade muito grande de pessoas, "
+                 "tenha bom senso ao utilizar uma menção que irá notificar centenas de pessoas."
+        )
+        print(f'> {message.author} used a not allowed mention '
+              f'in channel #{message.channel} at {datetime.datetime.now()}')
+        print(f"Content:\n<\n{message.content}\n>")
+        await message.delete()
+        return await message.channel.send(content=message.author.mention, embed=embed)
+
+    @staticmethod
+    async def rewrite_wiki_urls(message: discord.Message, formatted_urls: tuple):
+        """Replace old Rs Wikia links to the new Rs Wiki links"""
+        formatted_urls_string = ''
+        for url in formatted_urls:
+            formatted_urls_string += f'- ***<{url}>***\n'
+
+        plural = 's' if len(formatted_urls) > 1 else ''
+        await message.channel.send(
+            f'Olá, parece que você usou um ou mais links para a antiga Wiki do RuneScape!'
+            f'\n\n'
+            f'A wiki antiga não é mais suportada e está muito desatualizada. '
+            f'Ao invés do{plural} link{plural} que você enviou, utilize o{plural} link{plural} abaixo:\n\n'
+            f'{formatted_urls_string}')
+
+    async def join_or_leave_team(self, message: discord.Message, team_id: str, mode: str):
+        """Handles 'in {number}'/'out {number}' (or 'in raids'/'out raids') team join/leave messages"""
+        try:
+            await self.team_manager.submit(team_id, message, mode)
+        except TeamNotFoundError:
+            return await message.channel.send(f"Time com ID '{team_id}' não existe.")
+        except WrongChannelError:
+            return await message.channel.send(f"Você não pode entrar nesse time por esse canal.")
+        except Exception as e:
+            msg = 'entrar em' if mode == 'join' else 'sair de'
+            return await message.channel.send(
+                f"Erro inesperado ao tentar {msg} time. Favor reportar o erro para @NRiver#2263: {e}"
+            )
+
     async def on_member_remove(self, member: discord.Member):
         log_channel: discord.TextChannel = self.get_channel(593568562438864899)
         embed = discord.Embed(title='Saiu do Servidor', description="\u200B", color=discord.Color.red())
@@ -271,6 +339,19 @@ class Bot(commands.Bot):
         embed.set_footer(text=datetime.datetime.now())
         await log_channel.send(embed=embed)
 
+    def async_session(self) -> db.AsyncSession:
+        """Transactional scope whose blocking calls run in the database executor instead of the event loop"""
+        return db.AsyncSession(self.loop)
+
+    def embed_poster(self, name: str):
+        """Poster that background tasks queue their embeds on, see bot.utils.webhooks"""
+        return WebhookPoster(self, name)
+
+    async def run_db(self, func, *args, **kwargs):
+        """Runs func(session, *args, **kwargs) inside its own transaction without blocking the event loop"""
+        async with self.async_session() as db_session:
+            return await db_session.run(func, *args, **kwargs)
+
     @contextmanager
     def db_session(self) -> ContextManager[Session]:
         """
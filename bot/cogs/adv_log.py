@@ -1,114 +1,340 @@
 import asyncio
-import csv
+import collections
+import datetime
+import hashlib
+import time
 import traceback
 import re
-import feedparser
-import urllib.parse as urlparse
-from io import StringIO
+import sys
+from typing import List, NamedTuple, Optional, Set, Tuple
 
 from discord.ext import tasks, commands
 import aiohttp
 import discord
 
 from bot.bot_client import Bot
-from bot.orm.models import PlayerActivities, AdvLogState
+from bot.orm.models import PlayerActivityCursor
+from bot.utils.activities import Activity, ActivitySource, SOURCES
+from bot.utils.polling import PollScheduler
+from bot.utils.ratelimit import HostRateLimiter
+
+
+# Maximum number of entry IDs kept in a player's cursor to tell apart entries published at the same time
+RECENT_IDS_WINDOW = 50
+
+
+DatedEntry = Tuple[str, Optional[datetime.datetime]]
+
+
+class CursorState(NamedTuple):
+    """In-memory copy of a PlayerActivityCursor, 'recent_ids' are kept oldest first"""
+    last_date: Optional[datetime.datetime]
+    recent_ids: Tuple[str, ...]
+
+    @classmethod
+    def from_model(cls, cursor: PlayerActivityCursor) -> 'CursorState':
+        recent_ids = tuple(cursor.recent_ids.split(',')) if cursor.recent_ids else ()
+        return cls(cursor.last_date, recent_ids)
+
+    def new_ids(self, entries: List[DatedEntry]) -> Set[str]:
+        """IDs of the (entry ID, publish date) pairs that come after this cursor"""
+        recent_ids = set(self.recent_ids)
+        new_ids = set()
+        for entry_id, date in entries:
+            if entry_id in recent_ids:
+                continue
+            if self.last_date and date and date < self.last_date:
+                continue
+            new_ids.add(entry_id)
+        return new_ids
+
+    def advance(self, entries: List[DatedEntry]) -> 'CursorState':
+        dates = [date for _, date in entries if date]
+        newest = max(dates + ([self.last_date] if self.last_date else []), default=None)
+        # Feeds list the newest entries first, the window is kept oldest first so it's trimmed from the front
+        current = [entry_id for entry_id, date in reversed(entries) if date == newest or date is None]
+        current = list(dict.fromkeys(current))
+        previous = self.recent_ids if newest == self.last_date else ()
+        in_feed = set(current)
+        window = [entry_id for entry_id in previous if entry_id not in in_feed] + current
+        # Entries published at the same time as the ones still in the feed can't be told apart by their date,
+        # so the IDs in the feed are always kept and the older ones only while there's room left
+        return CursorState(newest, tuple(window[-max(RECENT_IDS_WINDOW, len(current)):]))
+
+
+class CursorCache:
+    """
+    Bounded LRU copy of the players' activity cursors, so most feeds can be checked without the database
+
+    The database stays the source of truth: a feed is only sent to the database when the cached cursor says it
+    has new entries (or when the player isn't cached), and the cache is updated with the cursor stored there.
+    A 'false positive' is a feed the cached cursor flagged that turned out to have nothing new, players that
+    weren't cached are only counted as misses.
+    """
+
+    def __init__(self, max_players: int = 5000):
+        self.max_players = max_players
+        self.cursors: 'collections.OrderedDict[str, CursorState]' = collections.OrderedDict()
+        self.stats = collections.Counter(hits=0, flagged=0, misses=0, false_positives=0)
+
+    def __len__(self):
+        return len(self.cursors)
+
+    def set(self, player: str, state: CursorState) -> None:
+        self.cursors[player] = state
+        self.cursors.move_to_end(player)
+        while len(self.cursors) > self.max_players:
+            self.cursors.popitem(last=False)
+
+    def may_have_new(self, player: str, entries: List[DatedEntry]) -> Tuple[bool, bool]:
+        """
+        Returns (may have new entries, whether the player was cached)
+
+        The first is False only if the cached cursor is sure none of the entries are new.
+        """
+        state = self.cursors.get(player)
+        if state is None:
+            self.stats['misses'] += 1
+            return True, False
+        self.cursors.move_to_end(player)
+        if state.new_ids(entries):
+            self.stats['flagged'] += 1
+            return True, True
+        self.stats['hits'] += 1
+        return False, True
+
+    @property
+    def memory(self) -> int:
+        """Approximate memory used by the cached cursors, in bytes"""
+        size = sys.getsizeof(self.cursors)
+        for player, state in self.cursors.items():
+            size += sys.getsizeof(player) + sys.getsizeof(state) + sys.getsizeof(state.recent_ids)
+            size += sum(sys.getsizeof(entry_id) for entry_id in state.recent_ids)
+        return size
+
+    def __str__(self):
+        checks = self.stats['hits'] + self.stats['flagged'] + self.stats['misses']
+        hit_ratio = self.stats['hits'] / checks if checks else 0
+        flagged = self.stats['flagged']
+        false_positive_rate = self.stats['false_positives'] / flagged if flagged else 0
+        return (f"{len(self)}/{self.max_players} jogadores ({self.memory / 1024:.0f} KB)\n"
+                f"Acertos: {hit_ratio:.0%} - Falsos positivos: {false_positive_rate:.0%}")
+
+
+class CachedFeed(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fingerprint: bytes
+
+    def headers(self) -> dict:
+        """Headers for a conditional request of the feed"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FeedCache(dict):
+    """Feed URL -> CachedFeed, with counters of how many feeds were skipped and why"""
+
+    def __init__(self):
+        super().__init__()
+        self.stats = collections.Counter(not_modified=0, unchanged=0, parsed=0, bytes=0)
+
+    def __str__(self):
+        skipped = self.stats['not_modified'] + self.stats['unchanged']
+        total = skipped + self.stats['parsed']
+        ratio = skipped / total if total else 0
+        return (f"{ratio:.0%} dos feeds não modificados\n"
+                f"304: {self.stats['not_modified']} - Mesmo hash: {self.stats['unchanged']} - "
+                f"Lidos: {self.stats['parsed']}\n"
+                f"{self.stats['bytes'] / 1024 / 1024:.1f} MB baixados")
 
 
 class AdvLog(commands.Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.rate_limiter = HostRateLimiter(self.bot.setting.advlog_rate_limit)
+        # Clan name -> (number of players, seconds taken) of the last pass over that clan
+        self.passes = {}
+        self.feed_cache = FeedCache()
+        self.cursor_cache = CursorCache()
+        # Clan name -> its members' polling schedule
+        self.schedulers = {}
+        # Maximum number of feeds fetched for each clan every time the loop runs
+        self.players_per_tick = 60
+        self.poster = self.bot.embed_poster('Adv Log')
 
         self.adv_log.start()
 
     def cog_unload(self):
         self.adv_log.cancel()
+        self.bot.loop.create_task(self.poster.close())
 
-    def is_advlog_active(self):
-        with self.bot.db_session() as session:
-            state = session.query(AdvLogState).first()
-            if not state:
-                state = AdvLogState(messages=True)
-                session.add(state)
-                session.commit()
-            return state.messages
+    @staticmethod
+    def register_activities(session, player: str, entries: List[DatedEntry]) -> Tuple[Set[str], CursorState]:
+        """
+        Advances the player's activity cursor past the given (entry ID, publish date) pairs
+
+        Returns the new entry IDs and the updated cursor. Players seen for the first time have their
+        current entries taken as a baseline, none of them are new.
+        """
+        cursor: PlayerActivityCursor = session.query(PlayerActivityCursor).filter_by(player=player).first()
+        if not cursor:
+            cursor = PlayerActivityCursor(player=player, last_date=None, recent_ids='')
+            session.add(cursor)
+            baseline = True
+        else:
+            baseline = False
+
+        state = CursorState.from_model(cursor)
+        new_ids = state.new_ids(entries)
+        state = state.advance(entries)
+        cursor.last_date = state.last_date
+        cursor.recent_ids = ','.join(state.recent_ids)
+        return set() if baseline else new_ids, state
+
+    @staticmethod
+    def load_cursors(session) -> List[Tuple[str, CursorState]]:
+        return [(cursor.player, CursorState.from_model(cursor)) for cursor in session.query(PlayerActivityCursor)]
 
     # noinspection PyCallingNonCallable
     @tasks.loop(seconds=15)
     async def adv_log(self):
-        if self.is_advlog_active():
-            async with aiohttp.ClientSession() as cs:
+        if self.bot.state.advlog.messages:
+            try:
+                for get_clan in self.bot.setting.advlog_clans:
+                    await self.clan_pass(get_clan)
+            except Exception as e:
+                await self.bot.send_logs(e, traceback.format_exc())
+
+    async def clan_pass(self, clan: dict) -> None:
+        """
+        Fetches the Adventurer's log of the clan members that are due to be polled concurrently, then queues
+        the new entries, oldest first, to be posted through the clan channel's webhook
+
+        Players are polled according to their recent activity, see PollScheduler.
+        """
+        start = time.monotonic()
+        clan_name = clan.get('name').replace(' ', '%20')
+        roster = await self.bot.clan_rosters.get(clan.get('name'))
+        channel: discord.TextChannel = self.bot.get_channel(clan.get('chat'))
+        banner = f"http://services.runescape.com/m=avatar-rs/{clan_name}/clanmotif.png"
+
+        semaphore = asyncio.Semaphore(self.bot.setting.advlog_concurrency)
+
+        source = SOURCES[clan.get('source', 'rss')]
+
+        async def fetch(player_name: str):
+            async with semaphore:
                 try:
-                    for get_clan in self.bot.setting.advlog_clans:
-                        clan_name = get_clan.get('name').replace(' ', '%20')
-                        clan_list: list = await self.retrieve_clan_list(cs, clan_name)
-                        channel: discord.TextChannel = self.bot.get_channel(get_clan.get('chat'))
-                        banner = f"http://services.runescape.com/m=avatar-rs/{clan_name}/clanmotif.png"
-
-                        for player in clan_list[1:]:
-                            player = player[0]
-                            entries = await self.retrieve_activities(cs, player)
-                            if not entries:
-                                continue
-                            for entry in entries:
-                                if not self.is_advlog_active():
-                                    await asyncio.sleep(10)
-                                    break
-                                parsed_url = urlparse.urlparse(entry.get('guid'))
-                                entry_id = urlparse.parse_qs(parsed_url.query).get('id')[0]
-                                with self.bot.db_session() as session:
-                                    exists = session.query(PlayerActivities).filter_by(activities_id=entry_id).first()
-                                if exists:
-                                    continue
-                                with self.bot.db_session() as session:
-                                    session.add(PlayerActivities(activities_id=entry_id))
-                                title = entry.get('title')
-                                description = entry.get('description')
-                                try:
-                                    description_exp = int(re.findall(r'\d+', entry.get('description'))[0])
-                                    if description_exp:
-                                        description = description.replace(str(description_exp), f"{description_exp:,}")
-                                    title_exp = int(re.findall(r'\d+', entry.get('title'))[0])
-                                    if title_exp:
-                                        title = title.replace(str(title_exp), f"{title_exp:,} ")
-                                except IndexError:
-                                    pass
-                                # Removing non-breaking spaces from the player's name, since they would break the URL
-                                # Source: https://stackoverflow.com/a/52254293
-                                player_icon_url = ' '.join(player.split()).replace(' ', '%20')
-                                icon_url = f"https://secure.runescape.com/m=avatar-rs/{player_icon_url}/chat.png"
-
-                                embed = discord.Embed(title=title, description=description)
-                                embed.set_author(name=player, icon_url=icon_url)
-                                embed.set_thumbnail(url=banner)
-                                pub_date = entry.get('published_parsed')
-                                if pub_date:
-                                    embed.set_footer(text=f"• {pub_date.tm_mday}/{pub_date.tm_mon}/{pub_date.tm_year}")
-                                await channel.send(embed=embed)
-                                await asyncio.sleep(5)
-                except Exception as e:
-                    await self.bot.send_logs(e, traceback.format_exc())
+                    return player_name, await self.retrieve_activities(player_name, source)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    return player_name, None
+                except ValueError as e:
+                    # A feed that can't be parsed only skips its player, the rest of the pass goes on
+                    print(f"Adv log feed of '{player_name}' couldn't be parsed: {e}")
+                    return player_name, None
+
+        scheduler = self.schedulers.setdefault(clan.get('name'), PollScheduler())
+        scheduler.retain((member.name for member in roster), start)
+        due = scheduler.due(start, limit=self.players_per_tick)
+        fetches = [self.bot.loop.create_task(fetch(player)) for player in due]
+        # (publish date, player, activity) of the new entries, posted oldest first once the pass is over
+        new_entries = []
+        try:
+            for fetched in asyncio.as_completed(fetches):
+                player, activities = await fetched
+                if not activities:
+                    scheduler.record(player, time.monotonic(), active=False)
+                    continue
+                dated_ids = [(activity.id, activity.date) for activity in activities]
+                may_have_new, cached = self.cursor_cache.may_have_new(player, dated_ids)
+                if not may_have_new:
+                    scheduler.record(player, time.monotonic(), active=False)
+                    continue
+                new_ids, state = await self.bot.run_db(self.register_activities, player, dated_ids)
+                self.cursor_cache.set(player, state)
+                if cached and not new_ids:
+                    self.cursor_cache.stats['false_positives'] += 1
+                scheduler.record(player, time.monotonic(), active=bool(new_ids))
+                # Feeds list the newest entries first
+                for activity in reversed(activities):
+                    if activity.id in new_ids:
+                        new_entries.append((activity.date or datetime.datetime.min, player, activity))
+        finally:
+            for fetch_task in fetches:
+                fetch_task.cancel()
+            new_entries.sort(key=lambda new_entry: new_entry[0])
+            for _, player, activity in new_entries:
+                self.poster.post(channel, self.entry_embed(banner, player, activity))
+        self.passes[clan.get('name')] = (len(fetches), time.monotonic() - start)
+
+    @staticmethod
+    def entry_embed(banner: str, player: str, activity: Activity) -> discord.Embed:
+        title = activity.title
+        description = activity.description
+        try:
+            description_exp = int(re.findall(r'\d+', activity.description)[0])
+            if description_exp:
+                description = description.replace(str(description_exp), f"{description_exp:,}")
+            title_exp = int(re.findall(r'\d+', activity.title)[0])
+            if title_exp:
+                title = title.replace(str(title_exp), f"{title_exp:,} ")
+        except IndexError:
+            pass
+        # Removing non-breaking spaces from the player's name, since they would break the URL
+        # Source: https://stackoverflow.com/a/52254293
+        player_icon_url = ' '.join(player.split()).replace(' ', '%20')
+        icon_url = f"https://secure.runescape.com/m=avatar-rs/{player_icon_url}/chat.png"
+
+        embed = discord.Embed(title=title, description=description)
+        embed.set_author(name=player, icon_url=icon_url)
+        embed.set_thumbnail(url=banner)
+        if activity.date:
+            embed.set_footer(text=f"• {activity.date.day}/{activity.date.month}/{activity.date.year}")
+        return embed
 
     @adv_log.before_loop
     async def before_adv_log(self):
         await self.bot.wait_until_ready()
+        for player, state in await self.bot.run_db(self.load_cursors):
+            self.cursor_cache.set(player, state)
 
-    @staticmethod
-    async def retrieve_activities(cs: aiohttp.ClientSession, player: str) -> list:
-        url = f'http://services.runescape.com/m=adventurers-log/l=3/a=869/rssfeed?searchName={player}'
-        async with cs.get(url) as r:
-            text = await r.text()
-            feed = feedparser.parse(text)
-            if r.status == 200:
-                return feed.get('entries')
+    async def retrieve_activities(self, player: str,
+                                  source: ActivitySource = SOURCES['rss']) -> Optional[List[Activity]]:
+        """
+        Returns the activities of a player's Adventurer's log, read from the given source
 
-    @staticmethod
-    async def retrieve_clan_list(cs: aiohttp.ClientSession, clan_name: str) -> list:
-        clan_name = clan_name.replace(' ', '%20')
-        clan = f"http://services.runescape.com/m=clan-hiscores/members_lite.ws?clanName={clan_name}"
-        async with cs.get(clan) as r:
-            clan_csv = await r.text()
-            return list(csv.reader(StringIO(clan_csv), delimiter=','))
+        Returns None without parsing the response if it hasn't changed since the last time it was retrieved,
+        raises ValueError if the response can't be parsed
+        """
+        url = source.player_url(player)
+        await self.rate_limiter.wait(url)
+        cached = self.feed_cache.get(url)
+        # A slow response for a single player can't hold up the whole pass, and failed feeds aren't retried
+        # here since retries would skip the rate limiter, the player is polled again on a later pass
+        async with self.bot.http_client.get(url, headers=cached.headers() if cached else None,
+                                            timeout=aiohttp.ClientTimeout(total=20), retries=0) as r:
+            if r.status == 304:
+                self.feed_cache.stats['not_modified'] += 1
+                return None
+            content = await r.read()
+            if r.status != 200:
+                return None
+            self.feed_cache.stats['bytes'] += len(content)
+            fingerprint = hashlib.sha1(content).digest()
+            if cached and cached.fingerprint == fingerprint:
+                self.feed_cache.stats['unchanged'] += 1
+                return None
+            activities = source.parse(content)
+            self.feed_cache.stats['parsed'] += 1
+            # Only cached once parsed, a response that failed to parse is parsed again on the next pass
+            self.feed_cache[url] = CachedFeed(r.headers.get('ETag'), r.headers.get('Last-Modified'), fingerprint)
+            return activities
 
 
 def setup(bot):
@@ -6,7 +6,7 @@ from sqlalchemy.sql.expression import func
 
 import bot.orm.db as db
 from bot.bot_client import Bot
-from bot.orm.models import AmigoSecretoPerson, AmigoSecretoState
+from bot.orm.models import AmigoSecretoPerson
 from bot.utils.tools import has_any_role
 
 
@@ -18,17 +18,9 @@ class AmigoSecreto(commands.Cog):
     @commands.is_owner()
     @commands.command()
     async def toggle_amigo_secreto(self, ctx: commands.Context):
-        with self.bot.db_session() as session:
-            state = session.query(AmigoSecretoState).first()
-            if not state:
-                state = AmigoSecretoState(activated=True)
-                session.add(state)
-                session.commit()
-                session.close()
-                return await ctx.send("Amigo Secreto do Atlantis agora está ativo.")
-            state.activated = not state.activated
-            session.commit()
-            await ctx.send(f"O Amigo Secreto do Atlantis agora está {'ativo' if state.activated else 'desativado'}.")
+        state = self.bot.state.amigo_secreto
+        await state.update(self.bot, activated=not state.activated)
+        await ctx.send(f"O Amigo Secreto do Atlantis agora está {'ativo' if state.activated else 'desativado'}.")
 
     @commands.is_owner()
     @commands.command()
@@ -77,7 +69,7 @@ class AmigoSecreto(commands.Cog):
                 return await ctx.send("Não há nenhuma mensagem de Amigo Secreto para enviar.")
             dev = self.bot.get_user(self.bot.setting.developer_id)
             for member in query:
-                user = self.bot.get_user(int(member.discord_id))
+                user = self.bot.get_user(member.discord_id)
                 if not user:
                     await dev.send(
                         f'Erro ao enviar mensagem do AS para {member.discord_name} ({member.id}). Não existe')
@@ -137,15 +129,8 @@ class AmigoSecreto(commands.Cog):
     @commands.is_owner()
     @commands.command()
     async def check_amigo_secreto(self, ctx: commands.Context):
-        with self.bot.db_session() as session:
-            state = session.query(AmigoSecretoState).first()
-            if not state:
-                state = AmigoSecretoState(activated=False)
-                session.add(state)
-                session.commit()
-            current_state = state.activated
-            if not current_state:
-                return await ctx.send("O Amigo Secreto do Atlantis não está ativo.")
+        if not self.bot.state.amigo_secreto.activated:
+            return await ctx.send("O Amigo Secreto do Atlantis não está ativo.")
         return await ctx.send("O Amigo Secreto do Atlantis está ativo.")
 
     @commands.is_owner()
@@ -157,9 +142,10 @@ class AmigoSecreto(commands.Cog):
 
         with self.bot.db_session() as session:
             query = session.query(AmigoSecretoPerson).all()
+            # Members are offered to be removed, so a fresh roster is used instead of the cached one
+            clan = await self.bot.clan_rosters.refresh(self.bot.setting.clan_name)
             for member in query:
-                player = rs3clans.Player(member.ingame_name)
-                if player.clan != 'Atlantis':
+                if member.ingame_name not in clan:
                     await ctx.send(f'{member.ingame_name} ({member.discord_name}) não está no clã. Remover? (Y/n)')
                     answer = await self.bot.wait_for('message', timeout=60.0, check=check)
                     if answer.content.lower() == 'y':
@@ -174,14 +160,7 @@ class AmigoSecreto(commands.Cog):
     async def amigo_secreto(self, ctx: commands.Context):
         dev = self.bot.get_user(self.bot.setting.developer_id)
         await dev.send(f'{ctx.author} está se inscrevendo no amigo secreto.')
-        with self.bot.db_session() as session:
-            state = session.query(AmigoSecretoState).first()
-            if not state:
-                state = AmigoSecretoState(activated=False)
-                session.add(state)
-                session.commit()
-            current_state = state.activated
-        if not current_state:
+        if not self.bot.state.amigo_secreto.activated:
             return await ctx.send(f"{ctx.author.mention}, o Amigo Secreto do Atlantis ainda não está ativo.")
 
         atlantis = self.bot.get_guild(self.bot.setting.server_id)
@@ -227,13 +206,13 @@ class AmigoSecreto(commands.Cog):
 
         with self.bot.db_session() as session:
             exists = session.query(AmigoSecretoPerson).filter(
-                AmigoSecretoPerson.discord_id == str(ctx.author.id)).first()
+                AmigoSecretoPerson.discord_id == ctx.author.id).first()
             if exists:
                 session.close()
                 await ctx.send(f"{ctx.author.mention}, você já está cadastrado no Amigo Secreto!")
                 return await dev.send(f'{ctx.author}: Inscrição cancelada. Já está no Amigo Secreto.')
             session.add(AmigoSecretoPerson(
-                discord_id=str(ctx.author.id),
+                discord_id=ctx.author.id,
                 ingame_name=str(player.name),
                 discord_name=str(ctx.author)
             ))
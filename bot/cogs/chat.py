@@ -1,7 +1,6 @@
 from discord.ext import commands
 import discord
 import asyncio
-import rs3clans
 
 from bot.bot_client import Bot
 from bot.utils.tools import right_arrow, has_any_role
@@ -29,11 +28,14 @@ class Chat(commands.Cog):
         except asyncio.TimeoutError:
             return await ctx.send(f"{ctx.author.mention}, autenticação Cancelada. Tempo Esgotado.")
         await ctx.trigger_typing()
-        player = rs3clans.Player(ingame_name.content)
-        if not player.exists:
-            return await ctx.send(f"{ctx.author.mention}, o jogador '{player.name}' não existe.")
-        elif player.clan != self.bot.setting.clan_name:
-            return await ctx.send(f"{ctx.author.mention}, o jogador '{player.name}' não é um membro do Clã Atlantis.")
+        clan = await self.bot.clan_rosters.get(self.bot.setting.clan_name)
+        if ingame_name.content not in clan:
+            # The cached roster can be up to an hour old, someone who just joined the clan wouldn't be in it yet
+            clan = await self.bot.clan_rosters.refresh(self.bot.setting.clan_name)
+        if ingame_name.content not in clan:
+            return await ctx.send(
+                f"{ctx.author.mention}, o jogador '{ingame_name.content}' não é um membro do Clã Atlantis."
+            )
         return await ctx.send(
             f"{ctx.author.mention} um <@&{self.bot.setting.role.get('mod')}> ou "
             f"<@&{self.bot.setting.role.get('admin')}> irá dar seu cargo em breve :)"
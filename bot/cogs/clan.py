@@ -137,7 +137,7 @@ class Clan(commands.Cog):
             title="__Ranks a Atualizar__",
             description=" ", )
         found = False
-        clan = rs3clans.Clan(self.bot.setting.clan_name, set_exp=False)
+        clan = await self.bot.clan_rosters.get(self.bot.setting.clan_name)
         for member in clan:
             if member.rank == 'Recruit':
                 ranks_embed.add_field(
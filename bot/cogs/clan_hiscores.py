@@ -2,7 +2,6 @@ from operator import itemgetter
 import discord
 
 from discord.ext import commands
-import aiohttp
 
 from bot.bot_client import Bot
 from bot.utils.tools import separator
@@ -27,11 +26,10 @@ class ClanHiscores(commands.Cog):
     ])
     async def ptbr_rankings(self, ctx: commands.Context, num_clans: int = 10):
         base_url = 'https://nriver.pythonanywhere.com'
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(f'{base_url}/api/clan/list/') as r:
-                clans = await r.json()
-                if r.status != 200:
-                    return await ctx.send(f'Erro **{r.status}** ao se conectar a API dos Rankings de Clãs Pt-Br.')
+        async with self.bot.http_client.get(f'{base_url}/api/clan/list/') as r:
+            clans = await r.json()
+            if r.status != 200:
+                return await ctx.send(f'Erro **{r.status}** ao se conectar a API dos Rankings de Clãs Pt-Br.')
         rankings_embed = discord.Embed(
             title='Ranking de Clãs Pt-Br',
             color=discord.Color.green(),
@@ -1,13 +1,11 @@
-from contextlib import closing
-import codecs
 import csv
 
 from discord.ext import commands
 from bs4 import BeautifulSoup
 import discord
-import requests
 
 from bot.bot_client import Bot
+from bot.utils.http import HttpClient
 from bot.utils.tools import separator
 
 # TODO: The code from this whole freaking cog needs to be refactored
@@ -88,12 +86,12 @@ def translate(string: str):
     return string
 
 
-def competition_details(name: str, comp_id: int):
+async def competition_details(http_client: HttpClient, name: str, comp_id: int):
     url = f"http://www.runeclan.com/clan/{name}/{comp_id}"
-    request = requests.get(url)
-    if request.status_code != 200:
-        return 'FAILURE'
-    source = request.content.decode('utf-8', 'ignore')
+    async with http_client.get(url) as r:
+        if r.status != 200:
+            return 'FAILURE'
+        source = (await r.read()).decode('utf-8', 'ignore')
     soup = BeautifulSoup(source, 'lxml')
     competition_table = soup.find(
         'table',
@@ -139,13 +137,15 @@ def grab_competitions(content):
     return competitions
 
 
-def get_competitions(clan):
+async def get_competitions(http_client: HttpClient, clan):
     base_url = f"http://www.runeclan.com/clan/{clan}/"
     running_url = base_url + "competitions?view=1"
     finished_url = base_url + "competitions?view=2"
 
-    running_source = requests.get(running_url).content
-    finished_source = requests.get(finished_url).content
+    async with http_client.get(running_url) as r:
+        running_source = await r.read()
+    async with http_client.get(finished_url) as r:
+        finished_source = await r.read()
 
     running_competitions = grab_competitions(running_source)
     finished_competitions = grab_competitions(finished_source)
@@ -172,7 +172,7 @@ class Competitions(commands.Cog):
     @commands.bot_has_permissions(embed_links=True)
     @commands.command(aliases=['comps', 'competitions', 'competicoes', 'running_comps', 'competicoes_ativas', 'comp'])
     async def running_competitions(self, ctx: commands.Context, index=0, players=10):
-        competitions = get_competitions(self.bot.setting.clan_name)
+        competitions = await get_competitions(self.bot.http_client, self.bot.setting.clan_name)
         if not competitions['running_competitions']:
             return await ctx.send("Nenhuma competição ativa no momento :(")
         if len(competitions['running_competitions']) > 1 and index is 0:
@@ -229,7 +229,8 @@ class Competitions(commands.Cog):
                 value=f"{translate(competition['duration'])}",
                 inline=False)
             if competition['start_date'] == 'active':
-                comp_details = competition_details(self.bot.setting.clan_name, competition['link'])
+                comp_details = await competition_details(
+                    self.bot.http_client, self.bot.setting.clan_name, competition['link'])
                 if comp_details == 'FAILURE':
                     await ctx.send("Erro ao conectar ao RuneClan. Tente novamente mais tarde.")
                 comp_embed.add_field(
@@ -256,11 +257,11 @@ class Competitions(commands.Cog):
     async def comp_pontos(self, ctx: commands.Context, number=10):
         url = 'https://docs.google.com/spreadsheets/d/{key}/gviz/tq?tqx=out:csv&sheet={sheet_name}'
         url = url.format(key='1iHPQovW4NXFicJd6ot83QnrN9NyLlxcX3UraJHv9uPg', sheet_name='min')
-        with closing(requests.get(url, stream=True)) as r:
-            if r.status_code != 200:
+        async with self.bot.http_client.get(url) as r:
+            if r.status != 200:
                 return await ctx.send(
                     "Houve um erro tentando pegar as informações dessa competição, tente novamente mais tarde :(")
-            reader = csv.reader(codecs.iterdecode(r.iter_lines(), 'utf-8'), delimiter=',', quotechar='"')
+            reader = csv.reader((await r.text(encoding='utf-8')).splitlines(), delimiter=',', quotechar='"')
             if not reader:
                 return await ctx.send(
                     f'Nenhuma competição fazendo uso do sistema de pontos no momento. '
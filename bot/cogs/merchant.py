@@ -1,86 +1,71 @@
 import traceback
 import datetime
-import json
+from typing import Optional
 
-from discord.ext import tasks, commands
-from bs4 import BeautifulSoup
+from discord.ext import commands
 import discord
-import asyncio
-import aiohttp
 
 from bot.bot_client import Bot
+from bot.utils.merchant import MerchantStock, FUTURE_STOCK_URL, catalog, day_str, parse_future_stock
+from bot.utils.scheduler import every
 
 
 class Merchant(commands.Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.stock = MerchantStock.load()
+        # Today's stock embed, built once per day
+        self.embed: Optional[discord.Embed] = None
+        self.embed_day: Optional[datetime.date] = None
 
         if self.bot.setting.mode == 'prod':
-            self.update_merchant_stock.start()
+            # The stock changes at midnight UTC, the wiki is given 30 seconds to catch up
+            self.bot.scheduler.schedule(
+                'merchant_reset',
+                self.merchant_reset,
+                every(datetime.timedelta(days=1), start=datetime.datetime(2019, 1, 1, 0, 0, 30)),
+                catch_up=datetime.timedelta(hours=1)
+            )
+            self.bot.scheduler.call_at('merchant_message', datetime.datetime.utcnow(), self.update_merchant_message)
 
     def cog_unload(self):
         if self.bot.setting.mode == 'prod':
-            self.update_merchant_stock.cancel()
-
-    @staticmethod
-    def today_str() -> str:
-        today = datetime.datetime.utcnow()
-        return f"{today.day} {today.strftime('%B')} {today.year}"
-
-    async def daily_stock(self) -> list:
-        full_stock = await self.future_stock()
-        today = self.today_str()
-        item = full_stock.get(today)
-        if not item:
-            await self.bot.send_logs(full_stock, f'KeyError: {today}')
-            return []
-        return [self.get_item(item[f'slot_{letter}']) for letter in ['1', 'a', 'b', 'c']]
-
-    @staticmethod
-    def get_item(name: str):
-        with open('bot/merchant.json') as f:
-            merchant_file = json.load(f)
-        return merchant_file['stock'][name.replace(u'\xa0', u'')]
-
-    @staticmethod
-    async def future_stock() -> dict:
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get('https://runescape.wiki/w/Travelling_Merchant%27s_Shop/Future') as r:
-                source = await r.text()
-                soup = BeautifulSoup(source, 'lxml')
-                table = soup.find('table', attrs={'class': 'wikitable sticky-header'})
-                items = {}
-                for row in table.find_all('tr'):
-                    item = row.find_all('td')
-                    try:
-                        items[item[0].text] = {
-                            "slot_1": "Uncharted island map",
-                            "slot_a": item[1].text,
-                            "slot_b": item[2].text,
-                            "slot_c": item[3].text
-                        }
-                    except IndexError:
-                        pass
-                return items
+            self.bot.scheduler.cancel('merchant_reset')
+            self.bot.scheduler.cancel('merchant_message')
 
     @staticmethod
-    def time_till_midnight() -> int:
-        """
-        Returns the time till midnight in seconds
-        https://stackoverflow.com/a/45986036
-        """
-        dt = datetime.datetime.utcnow()
-        return ((24 - dt.hour - 1) * 60 * 60) + ((60 - dt.minute - 1) * 60) + (60 - dt.second)
-
-    async def merchant_embed(self):
+    def today() -> datetime.date:
+        return datetime.datetime.utcnow().date()
+
+    async def refresh_stock(self, force: bool = False) -> None:
+        """Fetches the future stock from the wiki, at most once a day unless forced"""
+        today = self.today()
+        if self.stock.fetched_today(today) and not force:
+            return
+        async with self.bot.http_client.get(FUTURE_STOCK_URL) as r:
+            source = await r.text()
+        # Parsing the whole page with lxml takes a while, so it's done outside the event loop
+        stock = await self.bot.loop.run_in_executor(None, parse_future_stock, source)
+        self.stock = MerchantStock(stock, today)
+        await self.bot.loop.run_in_executor(None, self.stock.save)
+
+    async def merchant_embed(self, force: bool = False) -> discord.Embed:
+        """Today's stock embed, only built again when the day changes (or when forced)"""
+        today = self.today()
+        if self.embed and self.embed_day == today and not force:
+            return self.embed
+        await self.refresh_stock(force=force)
+        stock = self.stock.items(today)
         embed = discord.Embed(
-            title=f"Estoque de Hoje ({self.today_str()})",
+            title=f"Estoque de Hoje ({day_str(today)})",
             description=f"",
             color=discord.Colour.dark_red(),
             url=f"https://runescape.wiki/w/Travelling_Merchant's_Shop"
         )
-        stock = await self.daily_stock()
+        if not stock:
+            await self.bot.send_logs(self.stock.stock, f'KeyError: {day_str(today)}')
+            return embed
         coins = '<:coins:573305319661240340>'
         nb_space = '\u200B'
 
@@ -90,34 +75,67 @@ class Merchant(commands.Cog):
                 value=f"{item['description']}\n{nb_space}",
                 inline=False
             )
+        self.embed = embed
+        self.embed_day = today
         return embed
 
-    # noinspection PyCallingNonCallable
-    @tasks.loop(seconds=10)
-    async def update_merchant_stock(self):
-        await self.bot.wait_until_ready()
+    async def update_merchant_message(self) -> bool:
+        """Edits the stock message in the merchant channel, trying again in 15 minutes if it fails"""
         try:
             channel: discord.TextChannel = self.bot.get_channel(self.bot.setting.chat.get('merchant_call'))
-            message: discord.Message = await channel.fetch_message(562120346979794944)
             embed = await self.merchant_embed()
-            await message.edit(content=None, embed=embed)
-            await asyncio.sleep(self.time_till_midnight() + 30)
-            await channel.send('<@&560997610954162198>', delete_after=600)
+            if self.embed_day != self.today():
+                # Today isn't in the stock fetched earlier, tries again with a new copy of the wiki page
+                embed = await self.merchant_embed(force=True)
+            state = self.bot.state.merchant
+            message_id = await self.bot.live_messages.update(channel, state.message_id, embed=embed)
+            if message_id != state.message_id:
+                await state.update(self.bot, message_id=message_id)
+            return True
         except Exception as e:
             tb = traceback.format_exc()
             print(e, tb)
             await self.bot.send_logs(e, tb)
-            await asyncio.sleep(60 * 15)
+            retry_at = datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
+            self.bot.scheduler.call_at('merchant_message', retry_at, self.update_merchant_message)
+            return False
 
-    @update_merchant_stock.before_loop
-    async def before_update_merchant_stock(self):
-        await self.bot.wait_until_ready()
+    async def merchant_reset(self) -> None:
+        """Builds the new day's embed at rollover, before anyone asks for it, and notifies the merchant role"""
+        if await self.update_merchant_message():
+            channel: discord.TextChannel = self.bot.get_channel(self.bot.setting.chat.get('merchant_call'))
+            await channel.send('<@&560997610954162198>', delete_after=600)
 
     @commands.command()
     async def send_merch(self, ctx: commands.Context):
         embed = await self.merchant_embed()
         await ctx.send(embed=embed)
 
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    @commands.bot_has_permissions(embed_links=True)
+    @commands.command(aliases=['mercador', 'merch', 'quando'])
+    async def merchant_item(self, ctx: commands.Context, *, item_name: str):
+        """Shows the next days an item will be sold by the Travelling Merchant"""
+        if not self.stock.stock:
+            await self.refresh_stock()
+        name = self.stock.index.search(item_name)
+        if not name:
+            return await ctx.send(f"Nenhum item do Mercador Viajante encontrado com o nome '{item_name}'.")
+        item = catalog().get(name, {'name': name, 'emoji': ''})
+        dates = self.stock.index.upcoming(name, self.today())
+        if dates:
+            description = '\n'.join(f"• {date.day}/{date.month}/{date.year}" for date in dates[:10])
+        else:
+            description = "Não será vendido nos próximos dias."
+        embed = discord.Embed(
+            title=f"{item['emoji']} {item['name']}",
+            description=description,
+            color=discord.Colour.dark_red(),
+            url="https://runescape.wiki/w/Travelling_Merchant%27s_Shop/Future"
+        )
+        embed.set_footer(text="Próximas datas em que o item estará à venda")
+        return await ctx.send(embed=embed)
+
 
 def setup(bot):
     bot.add_cog(Merchant(bot))
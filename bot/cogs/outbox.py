@@ -0,0 +1,59 @@
+import json
+import traceback
+from typing import List, Tuple
+
+import discord
+from discord.ext import tasks, commands
+
+from bot.bot_client import Bot
+from bot.orm.models import OutboxMessage
+
+
+class Outbox(commands.Cog):
+    """Posts the embeds left in the outbox by the background worker (atlantisbot_worker.py)"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        # Sender name -> the poster used for its embeds
+        self.posters = {}
+        # Maximum number of outbox messages taken every time the loop runs
+        self.batch_size = 100
+
+        # Only the background worker writes to the outbox, there's nothing to drain if it runs no cogs
+        if self.bot.setting.worker_extensions:
+            self.drain_outbox.start()
+
+    def cog_unload(self):
+        self.drain_outbox.cancel()
+        for poster in self.posters.values():
+            self.bot.loop.create_task(poster.close())
+
+    @staticmethod
+    def take_messages(session, limit: int) -> List[Tuple[int, str, str]]:
+        """Removes the oldest messages from the outbox and returns their (channel_id, sender, payload)"""
+        messages = session.query(OutboxMessage).order_by(OutboxMessage.id).limit(limit).all()
+        for message in messages:
+            session.delete(message)
+        return [(message.channel_id, message.sender, message.payload) for message in messages]
+
+    # noinspection PyCallingNonCallable
+    @tasks.loop(seconds=2)
+    async def drain_outbox(self):
+        try:
+            for channel_id, sender, payload in await self.bot.run_db(self.take_messages, self.batch_size):
+                channel = self.bot.get_channel(channel_id)
+                if not channel:
+                    continue
+                if sender not in self.posters:
+                    self.posters[sender] = self.bot.embed_poster(sender)
+                self.posters[sender].post(channel, discord.Embed.from_dict(json.loads(payload)))
+        except Exception as e:
+            await self.bot.send_logs(e, traceback.format_exc())
+
+    @drain_outbox.before_loop
+    async def before_drain_outbox(self):
+        await self.bot.wait_until_ready()
+
+
+def setup(bot):
+    bot.add_cog(Outbox(bot))
@@ -13,8 +13,7 @@ from discord.ext import commands
 import discord
 
 from bot.bot_client import Bot
-from bot.orm.models import RaidsState, Team, PlayerActivities, AdvLogState, AmigoSecretoState, AmigoSecretoPerson, \
-    DisabledCommand
+from bot.orm.models import Team, PlayerActivityCursor, AmigoSecretoPerson, DisabledCommand
 from bot.utils.tools import separator, plot_table
 
 
@@ -54,6 +53,16 @@ class Owner(commands.Cog):
             return await ctx.send('Houve algum erro reiniciando extensões. Verificar os Logs do bot.')
         return await ctx.send('Todas as extensões foram reiniciadas com sucesso.')
 
+    @commands.is_owner()
+    @commands.command(aliases=['reloadsettings'])
+    async def reload_settings(self, ctx: commands.Context):
+        """Reloads the bot settings from 'bot/bot_settings.json'"""
+        try:
+            self.bot.setting.reload()
+        except Exception as e:
+            return await ctx.send(f'Erro ao recarregar configurações:\n {type(e).__name__} : {e}')
+        return await ctx.send('Configurações recarregadas com sucesso.')
+
     @commands.is_owner()
     @commands.command()
     async def disable(self, ctx: commands.Context, command_name: str):
@@ -331,7 +340,7 @@ class Owner(commands.Cog):
 
     @commands.command()
     async def toggle_raids(self, ctx: commands.Context):
-        toggle = self.toggle_raids_notifications()
+        toggle = await self.toggle_raids_notifications()
         return await ctx.send(f"Notificações de Raids agora estão {'habilitadas' if toggle else 'desabilitadas'}.")
 
     @commands.command()
@@ -341,14 +350,14 @@ class Owner(commands.Cog):
 
     @commands.command()
     async def toggle_advlog(self, ctx: commands.Context):
-        toggle = self.toggle_advlog_messages()
+        toggle = await self.toggle_advlog_messages()
         return await ctx.send(f"Mensagens do Adv log agora estão {'habilitadas' if toggle else 'desabilitadas'}.")
 
     @commands.command()
     async def status(self, ctx: commands.Context):
         with self.bot.db_session() as session:
             team_count = session.query(Team).count()
-            advlog_count = session.query(PlayerActivities).count()
+            advlog_count = session.query(PlayerActivityCursor).count()
             amigosecreto_count = session.query(AmigoSecretoPerson).count()
             raids_notif = f"{'Habilitadas' if self.raids_notifications() else 'Desabilitadas'}"
             advlog = f"{'Habilitadas' if self.advlog_messages() else 'Desabilitadas'}"
@@ -360,66 +369,47 @@ class Owner(commands.Cog):
         embed.set_thumbnail(url=self.bot.setting.banner_image)
 
         embed.add_field(name="Times ativos", value=team_count)
-        embed.add_field(name="Adv Log Entries", value=advlog_count)
+        embed.add_field(name="Adv Log Cursores", value=advlog_count)
         embed.add_field(name="Notificações de Raids", value=raids_notif)
         embed.add_field(name="Mensagens de Adv Log", value=advlog)
         embed.add_field(name="Amigo Secreto", value=amigo_secreto)
         embed.add_field(name="Amigo Secreto Entries", value=amigosecreto_count)
+        embed.add_field(name="Lag do Event Loop", value=str(self.bot.loop_lag), inline=False)
+        embed.add_field(name="Cache de Membros de Clãs", value=str(self.bot.clan_rosters), inline=False)
+        embed.add_field(name="HTTP", value=str(self.bot.http_client)[:1024], inline=False)
+        embed.add_field(name="Próximas Tarefas", value=str(self.bot.scheduler)[:1024], inline=False)
+        embed.add_field(name="Mensagens de Status", value=str(self.bot.live_messages), inline=False)
+        adv_log = self.bot.get_cog('AdvLog')
+        if adv_log:
+            embed.add_field(name="Cache de Feeds do Adv Log", value=str(adv_log.feed_cache), inline=False)
+            embed.add_field(name="Cache de Cursores do Adv Log", value=str(adv_log.cursor_cache), inline=False)
+            embed.add_field(name="Envio do Adv Log", value=str(adv_log.poster), inline=False)
+            for clan, scheduler in adv_log.schedulers.items():
+                value = str(scheduler)
+                if clan in adv_log.passes:
+                    polled, seconds = adv_log.passes[clan]
+                    value += f"\nÚltima passada: {polled} jogadores em {seconds:.1f}s"
+                embed.add_field(name=f"Agendamento do Adv Log ({clan})", value=value, inline=False)
         return await ctx.send(embed=embed)
 
     def secret_santa(self):
-        with self.bot.db_session() as session:
-            state = session.query(AmigoSecretoState).first()
-            if not state:
-                state = AmigoSecretoState(activated=False)
-                session.add(state)
-                session.commit()
-            state_ = state.activated
-        return state_
+        return self.bot.state.amigo_secreto.activated
 
     def raids_notifications(self):
-        with self.bot.db_session() as session:
-            state = session.query(RaidsState).first()
-            if not state:
-                state = RaidsState(notifications=True)
-                session.add(state)
-                session.commit()
-            state_ = state.notifications
-        return state_
-
-    def toggle_raids_notifications(self):
-        with self.bot.db_session() as session:
-            state = session.query(RaidsState).first()
-            if not state:
-                state = RaidsState(notifications=True)
-                session.add(state)
-                session.commit()
-            state.notifications = not state.notifications
-            state_ = state.notifications
-            session.commit()
-        return state_
+        return self.bot.state.raids.notifications
+
+    async def toggle_raids_notifications(self):
+        state = self.bot.state.raids
+        await state.update(self.bot, notifications=not state.notifications)
+        return state.notifications
 
     def advlog_messages(self):
-        with self.bot.db_session() as session:
-            state = session.query(AdvLogState).first()
-            if not state:
-                state = AdvLogState(messages=True)
-                session.add(state)
-                session.commit()
-            state_ = state.messages
-        return state_
-
-    def toggle_advlog_messages(self):
-        with self.bot.db_session() as session:
-            state = session.query(AdvLogState).first()
-            if not state:
-                state = AdvLogState(messages=True)
-                session.add(state)
-                session.commit()
-            state.messages = not state.messages
-            state_ = state.messages
-            session.commit()
-        return state_
+        return self.bot.state.advlog.messages
+
+    async def toggle_advlog_messages(self):
+        state = self.bot.state.advlog
+        await state.update(self.bot, messages=not state.messages)
+        return state.messages
 
 
 def setup(bot):
@@ -2,71 +2,49 @@ import datetime
 import traceback
 import sys
 
-from discord.ext import tasks, commands
+from discord.ext import commands
 import discord
-import asyncio
 
 from bot.bot_client import Bot
+from bot.utils.scheduler import every
 from bot.utils.teams import delete_team
 from bot.utils.tools import separator
-from bot.orm.models import RaidsState, Team
+from bot.orm.models import Team
 
 
 class RaidsTasks(commands.Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
-        self.update_next_raids.start()
-        self.raids_teams.start()
+        if 'testraid' in sys.argv:
+            self.bot.scheduler.call_at('raids_team', datetime.datetime.utcnow(), self.start_raids_team)
+        else:
+            # A raids team missed by a restart is still started if it's less than 30 minutes late
+            self.bot.scheduler.schedule(
+                'raids_team', self.raids_team, self.next_raids, catch_up=datetime.timedelta(minutes=30))
+        if self.bot.setting.mode != 'dev':
+            # The message shows the time left in minutes, so it only changes once a minute
+            self.bot.scheduler.schedule('raids_message', self.update_next_raids, every(datetime.timedelta(minutes=1)))
+            self.bot.scheduler.call_at('raids_message_startup', datetime.datetime.utcnow(), self.update_next_raids)
 
     def cog_unload(self):
-        self.update_next_raids.cancel()
-        self.raids_teams.cancel()
+        for job in ('raids_team', 'raids_message', 'raids_message_startup'):
+            self.bot.scheduler.cancel(job)
 
-    # noinspection PyCallingNonCallable
-    @tasks.loop(seconds=15)
-    async def raids_teams(self) -> None:
-        """Starts a Raids Team every 2 days 1 hour before midnight UTC (RuneScape's Reset Time)"""
+    def next_raids(self, after: datetime.datetime) -> datetime.datetime:
+        """Raids happen every 2 days 1 hour before midnight UTC (RuneScape's Reset Time), from raids_start_date"""
+        return every(datetime.timedelta(days=2), start=self.bot.setting.raids_start_date)(after)
+
+    async def raids_team(self) -> None:
+        """Starts a Raids Team, if raids notifications are enabled"""
+        if self.bot.state.raids.notifications:
+            await self.start_raids_team()
 
-        if 'testraid' in sys.argv:
-            try:
-                await self.start_raids_team()
-                await asyncio.sleep(60 * 10)
-            except Exception as e:
-                tb = traceback.format_exc()
-                await self.bot.send_logs(e, tb)
-        else:
-            seconds_till_raids = self.time_till_raids(self.bot.setting.raids_start_date)
-            raids_diff = datetime.timedelta(seconds=seconds_till_raids)
-            print(f'Next Raids in: {raids_diff.days} '
-                  f'Days, {raids_diff.seconds // 3600} '
-                  f'Hours, {(raids_diff.seconds // 60) % 60} '
-                  f'Minutes')
-            await asyncio.sleep(seconds_till_raids)
-            if self.raids_notifications():
-                try:
-                    await self.start_raids_team()
-                except Exception as e:
-                    tb = traceback.format_exc()
-                    await self.bot.send_logs(e, tb)
-
-    @raids_teams.before_loop
-    async def before_raids_teams(self):
-        await self.bot.wait_until_ready()
-
-    # noinspection PyCallingNonCallable
-    @tasks.loop(seconds=30)
     async def update_next_raids(self) -> None:
         """Updates the message with the time until the next raids in the #raids channel"""
-
-        await self.bot.wait_until_ready()
-
-        if self.bot.setting.mode == 'dev':
-            return
-
         try:
-            seconds_till_raids = self.time_till_raids(self.bot.setting.raids_start_date)
-            raids_diff = datetime.timedelta(seconds=seconds_till_raids)
+            now = datetime.datetime.utcnow()
+            raids_diff = self.next_raids(now) - now
             days = raids_diff.days
             hours = raids_diff.seconds // 3600
             minutes = (raids_diff.seconds // 60) % 60
@@ -81,61 +59,20 @@ class RaidsTasks(commands.Cog):
 
             channel: discord.TextChannel = self.bot.get_channel(self.bot.setting.chat.get('raids'))
 
-            with self.bot.db_session() as session:
-                state = session.query(RaidsState).first()
-                if state:
-                    if state.time_to_next_message:
-                        message_id = int(state.time_to_next_message)
-                    else:
-                        sent = await channel.send(content=None, embed=embed)
-                        state.time_to_next_message = str(sent.id)
-                        message_id = sent.id
-                else:
-                    sent = await channel.send("Próxima notificação de Raids em:")
-                    session.add(RaidsState(notifications=False, time_to_next_message=str(sent.id)))
-                    state = session.query(RaidsState).first()
-                    message_id = sent.id
-                try:
-                    message: discord.Message = await channel.fetch_message(message_id)
-                    await message.edit(content=None, embed=embed)
-                except discord.errors.NotFound:
-                    sent = await channel.send(content=None, embed=embed)
-                    state.time_to_next_message = str(sent.id)
-                await asyncio.sleep(1)
+            state = self.bot.state.raids
+            message_id = await self.bot.live_messages.update(channel, state.time_to_next_message, embed=embed)
+            if message_id != state.time_to_next_message:
+                await state.update(self.bot, time_to_next_message=message_id)
         except Exception as e:
             tb = traceback.format_exc()
             await self.bot.send_logs(e, tb)
 
-    @update_next_raids.before_loop
-    async def before_update_next_raids(self):
-        await self.bot.wait_until_ready()
-
-    def raids_notifications(self) -> bool:
-        """Checks if raids notifications are turned on or off in the bot settings"""
-        with self.bot.db_session() as session:
-            state = session.query(RaidsState).first()
-            if not state:
-                state = RaidsState(notifications=True)
-                session.add(state)
-                session.commit()
-            return state.notifications
-
-    @staticmethod
-    def time_till_raids(start_date) -> int:
-        """Calculates the time between now and the next raids in seconds, assuming raids occur every 2 days"""
-        now = datetime.datetime.utcnow()
-        difference = start_date - now
-        if (now - start_date).days % 2 == 0:
-            # Add a day to the difference in case it has been an even number of days between start_date and now
-            return difference.seconds + (24 * 60 * 60)
-        return difference.seconds
-
     async def start_raids_team(self) -> None:
         """Starts a Raids Team, the owner of the team is the Bot itself"""
-        with self.bot.db_session() as session:
-            old_team = session.query(Team).filter_by(team_id='raids').first()
+        async with self.bot.async_session() as db:
+            old_team = await db.run(lambda session: session.query(Team).filter_by(team_id='raids').first())
             if old_team:
-                await delete_team(session, old_team, self.bot)
+                await delete_team(db, old_team, self.bot)
         if self.bot.setting.mode == 'prod':
             invite_channel_id = self.bot.setting.chat.get('raids_chat')
             team_channel_id = self.bot.setting.chat.get('raids')
@@ -176,11 +113,11 @@ class RaidsTasks(commands.Cog):
             title='Raids',
             size=10,
             role=self.bot.setting.role.get('raids'),
-            author_id=str(self.bot.user.id),
-            invite_channel_id=str(invite_channel_id),
-            invite_message_id=str(invite_message.id),
-            team_channel_id=str(team_channel_id),
-            team_message_id=str(team_message.id)
+            author_id=self.bot.user.id,
+            invite_channel_id=invite_channel_id,
+            invite_message_id=invite_message.id,
+            team_channel_id=team_channel_id,
+            team_message_id=team_message.id
         )
         with self.bot.db_session() as session:
             session.add(raids_team)
@@ -227,16 +164,14 @@ class RaidsTasks(commands.Cog):
         channel: discord.TextChannel = self.bot.get_channel(self.bot.setting.chat.get('raids'))
         sent: discord.Message = await channel.send("Próxima notificação de Raids em:")
 
-        with self.bot.db_session() as session:
-            state: RaidsState = session.query(RaidsState).first()
-            if state:
-                if state.time_to_next_message:
-                    message = await channel.fetch_message(int(state.time_to_next_message))
-                    if message:
-                        await message.delete()
-                state.time_to_next_message = str(sent.id)
-            else:
-                session.add(RaidsState(notifications=False, time_to_next_message=str(sent.id)))
+        message_id = self.bot.state.raids.time_to_next_message
+        if message_id:
+            self.bot.live_messages.forget(message_id)
+            try:
+                await channel.delete_messages([discord.Object(id=message_id)])
+            except discord.errors.NotFound:
+                pass
+        await self.bot.state.raids.update(self.bot, time_to_next_message=sent.id)
         await ctx.author.send("Mensagem da próxima notificação de Raids reenviada com sucesso.")
 
 
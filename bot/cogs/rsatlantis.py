@@ -2,7 +2,6 @@ import traceback
 
 from discord.ext import commands
 import asyncio
-import aiohttp
 
 from bot.bot_client import Bot
 
@@ -20,17 +19,15 @@ class RsAtlantis(commands.Cog):
         if self.bot.setting.mode == 'prod':
             self.update_clans_task.cancel()
 
-    @staticmethod
-    async def update_all_clans():
+    async def update_all_clans(self):
         base_url = 'https://nriver.pythonanywhere.com'
         while True:
             try:
-                async with aiohttp.ClientSession() as cs:
-                    async with cs.get(f'{base_url}/clan/update-all/') as r:
-                        if r.status != 200:
-                            print(f'Erro ao atualizar clãs: {r.status}')
-                        else:
-                            print(f'Exp dos Clãs atualizada com sucesso.')
+                async with self.bot.http_client.get(f'{base_url}/clan/update-all/') as r:
+                    if r.status != 200:
+                        print(f'Erro ao atualizar clãs: {r.status}')
+                    else:
+                        print(f'Exp dos Clãs atualizada com sucesso.')
                 await asyncio.sleep(60 * 5)
             except Exception as e:
                 print(f'{e}: {traceback.format_exc()}')
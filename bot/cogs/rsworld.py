@@ -4,7 +4,6 @@ from discord.ext import commands
 from bs4 import BeautifulSoup
 import discord
 import rs3clans
-import requests
 
 from bot.bot_client import Bot
 
@@ -23,7 +22,7 @@ class RsWorld(commands.Cog):
         if not player.clan:
             return await ctx.send(f"Jogador {player_name} não está em um clã.")
 
-        world = self.grab_world(player)
+        world = await self.grab_world(player)
         world_display = "Offline" if world == "Offline" else f"**Mundo:** {world}"
         nb = '\u200B'
         color = discord.Colour.green()
@@ -39,26 +38,27 @@ class RsWorld(commands.Cog):
 
         return await ctx.send(embed=embed)
 
-    @staticmethod
-    def grab_clan_id(clan_name: str):
+    async def grab_clan_id(self, clan_name: str):
         url = f"http://services.runescape.com/m=clan-hiscores/l=3/members.ws?clanName={clan_name}"
-        source = requests.get(url).content
+        async with self.bot.http_client.get(url) as r:
+            source = await r.read()
         soup = BeautifulSoup(source.decode('utf-8', 'ignore'), 'lxml')
 
         clan_id = soup.find('input', {'name': 'clanId'})
         if clan_id:
             return clan_id.get('value')
 
-    def grab_world(self, player: rs3clans.Player):
+    async def grab_world(self, player: rs3clans.Player):
 
-        clan_id = self.grab_clan_id(player.clan)
+        clan_id = await self.grab_clan_id(player.clan)
 
         player_search = player.name.replace(' ', '+')
 
         base_url = "http://services.runescape.com/m=clan-hiscores/l=3/a=254/members.ws"
         search_url = f"{base_url}?expandPlayerName={player_search}&clanId={clan_id}&ranking=-1&pageSize=1&submit=submit"
 
-        source = requests.get(search_url).content
+        async with self.bot.http_client.get(search_url) as r:
+            source = await r.read()
         soup = BeautifulSoup(source.decode('utf-8', 'ignore'), 'lxml')
         list_members = soup.findAll('div', {'class': 'membersListRow'})
 
@@ -7,7 +7,7 @@ from sqlalchemy import cast, Integer
 
 from bot.bot_client import Bot
 from bot.utils.tools import separator
-from bot.utils.teams import delete_team, update_team_message
+from bot.utils.teams import delete_team, update_team_message, Roster
 from bot.orm.models import Team, Player
 
 
@@ -22,7 +22,7 @@ async def is_team_owner(ctx: commands.Context):
         if not team:
             await ctx.send(f"Time com ID {team_id} não existe.")
             return False
-        if not int(team.author_id) == ctx.author.id:
+        if not team.author_id == ctx.author.id:
             await ctx.send(f"Você precisa ser o criador desse Time para fazer isso.")
             return False
         return True
@@ -39,7 +39,7 @@ async def is_in_team(ctx: commands.Context):
         if not team:
             await ctx.send(f"Time com ID {team_id} não existe.")
             return False
-        in_team = session.query(Player).filter_by(team=team.id, player_id=str(ctx.author.id)).first()
+        in_team = session.query(Player).filter_by(team=team.id, player_id=ctx.author.id).first()
         if not in_team:
             await ctx.send(f"Você precisa estar no Time para fazer isso.")
             return False
@@ -54,19 +54,21 @@ class Teams(commands.Cog):
     @commands.command(aliases=['teamrole', 'tr', 'setrole', 'sr'])
     async def team_role(self, ctx: commands.Context, team_id: str, to_add: discord.Member, *, role: str):
         with self.bot.db_session() as session:
-            team: Team = session.query(Team).filter_by(team_id=team_id).first()
-            if not team:
+            roster = Roster.load(session, team_id)
+            if not roster:
                 return await ctx.send(f"Time com ID {team_id} não existe.")
-            team_channel = self.bot.get_channel(int(team.team_channel_id))
+            team = roster.team
+            team_channel = self.bot.get_channel(team.team_channel_id)
             if not ctx.author.permissions_in(team_channel).manage_channels:
                 raise commands.MissingPermissions(['manage_messages'])
-            player = session.query(Player).filter_by(player_id=str(to_add.id), team=str(team.id)).first()
+            player = roster.player(to_add.id)
             if not player:
                 return await ctx.send(f"{ctx.author.mention}, esse jogador não está no time de ID {team_id}.")
             player.role = role
-            team_channel: discord.TextChannel = self.bot.get_channel(int(team.team_channel_id))
-            team_message: discord.Message = await team_channel.fetch_message(int(team.team_message_id))
-            await update_team_message(team_message, team, self.bot.setting.prefix, session)
+            team_message = await self.bot.live_messages.fetch(team_channel, team.team_message_id)
+            if not team_message:
+                return await ctx.send(f"A mensagem do time com ID {team_id} não existe mais.")
+            await update_team_message(self.bot, roster)
             team_url = team_message.jump_url
             msg = f"Role de {to_add.mention} no time **[{team.title}]({team_url})** foi alterado para '{role}'"
             embed = discord.Embed(title='', description=msg, color=discord.Color.green())
@@ -95,20 +97,20 @@ class Teams(commands.Cog):
     @commands.guild_only()
     @commands.command(aliases=['del'])
     async def delteam(self, ctx: commands.Context, team_id: str):
-        with self.bot.db_session() as session:
+        async with self.bot.async_session() as db:
             try:
                 await ctx.message.delete()
             except discord.errors.NotFound:
                 pass
-            team: Team = session.query(Team).filter_by(team_id=team_id).first()
+            team: Team = await db.run(lambda session: session.query(Team).filter_by(team_id=team_id).first())
             if not team:
                 return await ctx.send(f"ID inválida: {team_id}")
-            if int(team.author_id) != ctx.author.id:
+            if team.author_id != ctx.author.id:
                 if not ctx.author.permissions_in(ctx.channel).manage_roles:
                     raise commands.MissingPermissions(['manage_roles'])
-            if int(team.team_channel_id) != ctx.channel.id:
+            if team.team_channel_id != ctx.channel.id:
                 return await ctx.send('Você só pode deletar um time no canal que ele foi criado.')
-            await delete_team(session, team, self.bot)
+            await delete_team(db, team, self.bot)
             await ctx.author.send(f"Time '{team.title}' excluído com sucesso.")
 
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -366,11 +368,11 @@ class Teams(commands.Cog):
         with self.bot.db_session() as session:
             role = None
             if team.get('role'):
-                role = str(team.get('role'))
+                role = int(team.get('role'))
 
             role_secondary = None
             if team.get('role_secondary'):
-                role_secondary = str(team.get('role_secondary'))
+                role_secondary = int(team.get('role_secondary'))
 
             team = Team(
                 team_id=team.get('team_id'),
@@ -378,11 +380,11 @@ class Teams(commands.Cog):
                 size=team.get('size'),
                 role=role,
                 role_secondary=role_secondary,
-                author_id=str(team.get('author_id')),
-                invite_channel_id=str(team.get('invite_channel_id')),
-                invite_message_id=str(team.get('invite_message_id')),
-                team_channel_id=str(team.get('team_channel_id')),
-                team_message_id=str(team.get('team_message_id')),
+                author_id=team.get('author_id'),
+                invite_channel_id=team.get('invite_channel_id'),
+                invite_message_id=team.get('invite_message_id'),
+                team_channel_id=team.get('team_channel_id'),
+                team_message_id=team.get('team_message_id'),
                 secondary_limit=team.get('secondary_limit')
             )
             session.add(team)
@@ -2,6 +2,8 @@ import logging
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -20,14 +22,63 @@ if not database_url:
         print('No bot/bot_settings.json file found.')
         sys.exit(1)
 
-if database_url:
+if database_url and not database_url.startswith('sqlite'):
     engine = create_engine(database_url, pool_size=35, max_overflow=0)
+    db_workers = 10
 else:
-    engine = create_engine('sqlite:///db.sqlite3', connect_args={'timeout': 15})
+    # Sessions may be opened in one thread of the executor and committed in another
+    engine = create_engine(database_url or 'sqlite:///db.sqlite3',
+                           connect_args={'timeout': 15, 'check_same_thread': False})
+    # SQLite only allows one writer at a time anyway
+    db_workers = 1
 
 Base.metadata.create_all(bind=engine)
 Session = sessionmaker(bind=engine, autoflush=False)
 
+# Blocking database calls made from coroutines are run here, so they never block the event loop
+executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix='db')
+
+
+class AsyncSession:
+    """
+    Transactional scope around a Session whose blocking calls are run in the database executor
+
+    Usage:
+        async with AsyncSession(loop) as db:
+            team = await db.run(lambda session: session.query(Team).first())
+            db.session.add(...)  # Only in-memory operations may be done directly with autoflush disabled
+
+    The session is committed (or rolled back on error) and closed in the executor when the block ends.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.session = None
+
+    async def run(self, func, *args, **kwargs):
+        """Runs func(session, *args, **kwargs) in the database executor and returns its result"""
+        return await self.loop.run_in_executor(executor, partial(func, self.session, *args, **kwargs))
+
+    async def __aenter__(self) -> 'AsyncSession':
+        self.session = Session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        def close(session, failed: bool):
+            try:
+                if failed:
+                    session.rollback()
+                else:
+                    session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+        await self.loop.run_in_executor(executor, close, self.session, exc_type is not None)
+
+
 logging.basicConfig()
 logging.getLogger('sqlalchemy.engine').setLevel(logging.ERROR)
 logging.getLogger('sqlalchemy.engine').addHandler(logging.FileHandler('db.log'))
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -10,19 +10,24 @@ Base = declarative_base()
 class Player(Base):
     __tablename__ = 'player'
     id = Column(Integer, primary_key=True)
-    player_id = Column(String)
+    player_id = Column(BigInteger)
     in_team = Column(Boolean)
     substitute = Column(Boolean, default=False)
     secondary = Column(Boolean, default=False)
     role = Column(String, nullable=True)
     team = Column(Integer, ForeignKey('team.id', ondelete='CASCADE'))
 
+    __table_args__ = (
+        Index('ix_player_team_player_id', 'team', 'player_id'),
+        Index('ix_player_team_substitute', 'team', 'substitute'),
+    )
+
 
 class BotMessage(Base):
     __tablename__ = 'botmessage'
     id = Column(Integer, primary_key=True)
-    message_id = Column(String)
-    team = Column(Integer, ForeignKey('team.id', ondelete='CASCADE'))
+    message_id = Column(BigInteger)
+    team = Column(Integer, ForeignKey('team.id', ondelete='CASCADE'), index=True)
 
 
 class Team(Base):
@@ -32,13 +37,13 @@ class Team(Base):
     team_id = Column(String, unique=True)
     title = Column(String)
     size = Column(Integer)
-    role = Column(String)
-    role_secondary = Column(String)
-    author_id = Column(String)
-    invite_channel_id = Column(String)
-    invite_message_id = Column(String)
-    team_channel_id = Column(String)
-    team_message_id = Column(String)
+    role = Column(BigInteger)
+    role_secondary = Column(BigInteger)
+    author_id = Column(BigInteger)
+    invite_channel_id = Column(BigInteger)
+    invite_message_id = Column(BigInteger)
+    team_channel_id = Column(BigInteger)
+    team_message_id = Column(BigInteger)
     secondary_limit = Column(Integer, nullable=True)
 
     players = relationship(Player, backref='parent', cascade="all,delete,delete-orphan")
@@ -54,7 +59,7 @@ class RaidsState(Base):
     __tablename__ = 'raidsstate'
     id = Column(Integer, primary_key=True)
     notifications = Column(Boolean, default=False)
-    time_to_next_message = Column(String, nullable=True)
+    time_to_next_message = Column(BigInteger, nullable=True)
 
 
 class AdvLogState(Base):
@@ -69,16 +74,46 @@ class DisabledCommand(Base):
     name = Column(String, unique=True)
 
 
-class PlayerActivities(Base):
-    __tablename__ = 'playeractivities'
+class PlayerActivityCursor(Base):
+    """
+    Latest Adventurer's log entry already processed for a player
+
+    recent_ids holds the comma separated IDs of the entries published at last_date, since many entries
+    can share the same publish date.
+    """
+    __tablename__ = 'playeractivitycursor'
+    id = Column(Integer, primary_key=True)
+    player = Column(String, unique=True)
+    last_date = Column(DateTime, nullable=True)
+    recent_ids = Column(String, default='')
+
+
+class OutboxMessage(Base):
+    """
+    Embed produced by the background worker, waiting to be posted by the bot's gateway process
+
+    payload holds the embed as a JSON dict, sender the name of the poster (and webhook) that should post it.
+    """
+    __tablename__ = 'outboxmessage'
     id = Column(Integer, primary_key=True)
-    activities_id = Column(String, unique=True)
+    channel_id = Column(BigInteger)
+    sender = Column(String)
+    payload = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class ScheduledJob(Base):
+    """Last time a recurring job of the bot's scheduler ran, so runs missed while offline can be caught up"""
+    __tablename__ = 'scheduledjob'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    last_run = Column(DateTime, nullable=True)
 
 
 class AmigoSecretoPerson(Base):
     __tablename__ = 'amigosecreto'
     id = Column(Integer, primary_key=True)
-    discord_id = Column(String, unique=True)
+    discord_id = Column(BigInteger, unique=True)
     discord_name = Column(String)
     ingame_name = Column(String)
     giving_to_id = Column(Integer, nullable=True, default=None, unique=True)
@@ -96,4 +131,11 @@ class SongOfSerenState(Base):
     __tablename__ = 'sos_state'
     id = Column(Integer, primary_key=True)
     activated = Column(Boolean, default=False)
-    message_id = Column(String, nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+
+
+class MerchantState(Base):
+    """The message in the merchant channel that shows the Travelling Merchant's stock of the day"""
+    __tablename__ = 'merchant_state'
+    id = Column(Integer, primary_key=True)
+    message_id = Column(BigInteger, nullable=True)
@@ -1,117 +1,268 @@
 import datetime
 import json
 import os
+import time
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+
+SETTINGS_PATH = 'bot/bot_settings.json'
+CLAN_SETTINGS_PATH = 'bot/clan_settings.json'
+
+# Minimum amount of seconds between two checks of the settings file's mtime
+MTIME_CHECK_INTERVAL = 5
+
+# Cogs that only need the database and the Jagex APIs, and so can be run by the background worker
+WORKER_EXTENSIONS = ('adv_log',)
+
+
+def freeze(value):
+    """Recursively turns dicts and lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def supported_worker_extensions(extensions: list) -> tuple:
+    """The cogs of the 'worker_extensions' setting the background worker can run, warning about the others"""
+    unsupported = [cog for cog in extensions if cog not in WORKER_EXTENSIONS]
+    if unsupported:
+        print(f"Cogs {unsupported} in 'worker_extensions' can't be run by the background worker, "
+              f"they are run by the bot instead. Supported: {list(WORKER_EXTENSIONS)}")
+    return tuple(cog for cog in extensions if cog in WORKER_EXTENSIONS)
+
+
+class Snapshot(NamedTuple):
+    """Immutable, pre-parsed view of 'bot/bot_settings.json' at a given mtime"""
+    mtime: float
+    mode: str
+    developer_id: int
+    guild_id: int
+    token: Optional[str]
+    description: str
+    dev_guild: int
+    playing_message: str
+    prefix: str
+    disabled_extensions: tuple
+    worker_extensions: tuple
+    clan_name: str
+    show_titles: bool
+    advlog_clans: tuple
+    advlog_concurrency: int
+    advlog_rate_limit: float
+    clan_roster_ttl: int
+    banner_image: str
+    raids_start_date: datetime.datetime
+    not_allowed_in_name: tuple
+    server_id: int
+    welcome_channel_id: int
+    welcome_message_id: int
+    chat: MappingProxyType
+    role: MappingProxyType
+    roles_channel_id: int
+    general_roles_id: int
+    pvm_roles_id: int
+    react_roles_id: int
+
+    @classmethod
+    def from_data(cls, data: dict, mtime: float) -> 'Snapshot':
+        token = data['BOT']['bot_token']
+        if token == 'BOT_TOKEN_HERE':
+            token = os.environ.get('ATLBOT_TOKEN')
+        return cls(
+            mtime=mtime,
+            mode=data['BOT']['mode'],
+            developer_id=data['BOT']['developer_id'],
+            guild_id=data['BOT']['guild_id'],
+            token=token,
+            description=data['BOT']['description'],
+            dev_guild=data['BOT']['dev_guild'],
+            playing_message=data['BOT']['playing_message'],
+            prefix=data['BOT']['commands_prefix'],
+            disabled_extensions=freeze(data['BOT']['disabled_extensions']),
+            worker_extensions=supported_worker_extensions(data['BOT'].get('worker_extensions', [])),
+            clan_name=data['RUNESCAPE']['clan_name'],
+            show_titles=data['RUNESCAPE']['show_titles'],
+            advlog_clans=freeze(data['RUNESCAPE']['advlog_clans']),
+            advlog_concurrency=data['RUNESCAPE'].get('advlog_concurrency', 10),
+            advlog_rate_limit=data['RUNESCAPE'].get('advlog_rate_limit', 10),
+            clan_roster_ttl=data['RUNESCAPE'].get('clan_roster_ttl', 3600),
+            banner_image=data['OTHER']['banner_image'],
+            raids_start_date=datetime.datetime.strptime(data['OTHER']['raids_start_date'], '%H:%M:%S %Y/%m/%d'),
+            not_allowed_in_name=freeze(data['OTHER']['not_allowed_in_name']),
+            server_id=data['SERVER']['server_id'],
+            welcome_channel_id=data['SERVER']['welcome_channel_id'],
+            welcome_message_id=data['SERVER']['welcome_message_id'],
+            chat=freeze(data['SERVER']['chat_id']),
+            role=freeze(data['SERVER']['role_id']),
+            roles_channel_id=data['SERVER']['roles_channel_id'],
+            general_roles_id=data['SERVER']['general_roles_id'],
+            pvm_roles_id=data['SERVER']['pvm_roles_id'],
+            react_roles_id=data['SERVER']['react_roles_id'],
+        )
 
 
 class Settings:
+    """
+    Settings loaded once from 'bot/bot_settings.json' into an immutable Snapshot
+
+    The file is only read and parsed again when its mtime changes (checked at most once
+    every MTIME_CHECK_INTERVAL seconds) or when reload() is called explicitly.
+    """
+
+    def __init__(self, path: str = SETTINGS_PATH):
+        self.path = path
+        self._snapshot: Snapshot = None
+        self._clan_settings: MappingProxyType = None
+        self._last_check = 0.0
+        self.reload()
+
     @staticmethod
-    def read_data():
-        with open('bot/bot_settings.json', 'r') as f:
+    def read_data(path: str = SETTINGS_PATH) -> dict:
+        with open(path, 'r') as f:
             return json.load(f)
 
+    def reload(self) -> Snapshot:
+        """Forces the settings files to be read again"""
+        mtime = os.stat(self.path).st_mtime
+        self._snapshot = Snapshot.from_data(self.read_data(self.path), mtime)
+        self._clan_settings = freeze(self.read_data(CLAN_SETTINGS_PATH))
+        self._last_check = time.monotonic()
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> Snapshot:
+        now = time.monotonic()
+        if now - self._last_check >= MTIME_CHECK_INTERVAL:
+            self._last_check = now
+            try:
+                if os.stat(self.path).st_mtime != self._snapshot.mtime:
+                    self.reload()
+            except (OSError, ValueError, KeyError):
+                # Keep serving the last good snapshot if the file is missing or half-written
+                pass
+        return self._snapshot
+
     @property
     def clan_settings(self):
-        with open('bot/clan_settings.json', 'r') as f:
-            return json.load(f)
+        return self._clan_settings
 
     @property
     def mode(self):
-        return self.read_data()['BOT']['mode']
+        return self.snapshot.mode
 
     @property
     def developer_id(self):
-        return self.read_data()['BOT']['developer_id']
+        return self.snapshot.developer_id
 
     @property
     def guild_id(self):
-        return self.read_data()['BOT']['guild_id']
+        return self.snapshot.guild_id
 
     @property
     def token(self):
-        token_ = self.read_data()['BOT']['bot_token']
-        if token_ == 'BOT_TOKEN_HERE':
-            return os.environ.get('ATLBOT_TOKEN')
-        return token_
+        return self.snapshot.token
 
     @property
     def description(self):
-        return self.read_data()['BOT']['description']
+        return self.snapshot.description
 
     @property
     def dev_guild(self):
-        return self.read_data()['BOT']['dev_guild']
+        return self.snapshot.dev_guild
 
     @property
     def playing_message(self):
-        return self.read_data()['BOT']['playing_message']
+        return self.snapshot.playing_message
 
     @property
     def prefix(self):
-        return self.read_data()['BOT']['commands_prefix']
+        return self.snapshot.prefix
 
     @property
     def disabled_extensions(self):
-        return self.read_data()['BOT']['disabled_extensions']
+        return self.snapshot.disabled_extensions
+
+    @property
+    def worker_extensions(self):
+        """Cogs run by the background worker (atlantisbot_worker.py) instead of the bot itself, see WORKER_EXTENSIONS"""
+        return self.snapshot.worker_extensions
 
     @property
     def clan_name(self):
-        return self.read_data()['RUNESCAPE']['clan_name']
+        return self.snapshot.clan_name
 
     @property
     def show_titles(self):
-        return self.read_data()['RUNESCAPE']['show_titles']
+        return self.snapshot.show_titles
 
     @property
     def advlog_clans(self):
-        return self.read_data()['RUNESCAPE']['advlog_clans']
+        return self.snapshot.advlog_clans
+
+    @property
+    def advlog_concurrency(self):
+        return self.snapshot.advlog_concurrency
+
+    @property
+    def advlog_rate_limit(self):
+        """Maximum number of requests per second made to each Jagex host by the Adventurer's log"""
+        return self.snapshot.advlog_rate_limit
+
+    @property
+    def clan_roster_ttl(self):
+        """Seconds a clan's member list is cached before being fetched again"""
+        return self.snapshot.clan_roster_ttl
 
     @property
     def banner_image(self):
-        return self.read_data()['OTHER']['banner_image']
+        return self.snapshot.banner_image
 
     @property
     def raids_start_date(self):
-        return datetime.datetime.strptime(self.read_data()['OTHER']['raids_start_date'], '%H:%M:%S %Y/%m/%d')
+        return self.snapshot.raids_start_date
 
     @property
     def not_allowed_in_name(self):
-        return self.read_data()['OTHER']['not_allowed_in_name']
+        return self.snapshot.not_allowed_in_name
 
     @property
     def server_id(self):
-        return self.read_data()['SERVER']['server_id']
+        return self.snapshot.server_id
 
     @property
     def welcome_channel_id(self):
-        return self.read_data()['SERVER']['welcome_channel_id']
+        return self.snapshot.welcome_channel_id
 
     @property
     def welcome_message_id(self):
-        return self.read_data()['SERVER']['welcome_message_id']
+        return self.snapshot.welcome_message_id
 
     @property
     def chat(self):
-        return self.read_data()['SERVER']['chat_id']
+        return self.snapshot.chat
 
     @property
     def role(self):
-        return self.read_data()['SERVER']['role_id']
+        return self.snapshot.role
 
     @property
     def roles_channel_id(self):
-        return self.read_data()['SERVER']['roles_channel_id']
+        return self.snapshot.roles_channel_id
 
     @property
     def general_roles_id(self):
-        return self.read_data()['SERVER']['general_roles_id']
+        return self.snapshot.general_roles_id
 
     @property
     def pvm_roles_id(self):
-        return self.read_data()['SERVER']['pvm_roles_id']
+        return self.snapshot.pvm_roles_id
 
     @property
     def react_roles_id(self):
-        return self.read_data()['SERVER']['react_roles_id']
+        return self.snapshot.react_roles_id
 
 
 default_settings = {
@@ -124,7 +275,8 @@ default_settings = {
         "dev_guild": 268897682066505738,
         "playing_message": "!atlbot",
         "commands_prefix": "!",
-        "disabled_extensions": []
+        "disabled_extensions": [],
+        "worker_extensions": []
     },
     "RUNESCAPE": {
         "clan_name": "Atlantis",
@@ -132,13 +284,18 @@ default_settings = {
         "advlog_clans": [
             {
                 "name": "Iron Atlantis",
-                "chat": 521499765696102420
+                "chat": 521499765696102420,
+                "source": "runemetrics"
             },
             {
                 "name": "Atlantis",
-                "chat": 570985364290797590
+                "chat": 570985364290797590,
+                "source": "rss"
             }
-        ]
+        ],
+        "advlog_concurrency": 10,
+        "advlog_rate_limit": 10,
+        "clan_roster_ttl": 3600
     },
     "OTHER": {
         "banner_image": "http://rsatlantis.com/images/logo.png",
@@ -0,0 +1,86 @@
+import datetime
+import hashlib
+import json
+import urllib.parse as urlparse
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import feedparser
+
+
+class Activity(NamedTuple):
+    """An Adventurer's log entry, the same regardless of where it was read from"""
+    id: str
+    title: str
+    description: str
+    date: Optional[datetime.datetime]
+
+
+def parse_rss(content: bytes) -> List[Activity]:
+    """Parses the Adventurer's log RSS feed (m=adventurers-log/rssfeed), entries without an ID are skipped"""
+    activities = []
+    for entry in feedparser.parse(content).get('entries', []):
+        activity_id = urlparse.parse_qs(urlparse.urlparse(entry.get('guid') or '').query).get('id')
+        if not activity_id:
+            continue
+        published = entry.get('published_parsed')
+        activities.append(Activity(
+            id=activity_id[0],
+            title=entry.get('title', ''),
+            description=entry.get('description', ''),
+            date=datetime.datetime(*published[:6]) if published else None
+        ))
+    return activities
+
+
+def parse_runemetrics(content: bytes) -> List[Activity]:
+    """
+    Parses the activities of a RuneMetrics profile (runemetrics/profile/profile?activities=20)
+
+    RuneMetrics activities don't have an ID, so one is made from their date and text.
+    Private or non-existent profiles have no activities. Raises ValueError if the response isn't a JSON object.
+    """
+    profile = json.loads(content)
+    if not isinstance(profile, dict):
+        raise ValueError(f"Expected a RuneMetrics profile, got {type(profile).__name__}")
+    activities = []
+    for activity in profile.get('activities') or []:
+        try:
+            date = datetime.datetime.strptime(activity['date'], '%d-%b-%Y %H:%M')
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 'text' not in activity:
+            continue
+        activity_id = hashlib.sha1(f"{activity['date']}{activity['text']}".encode()).hexdigest()[:16]
+        activities.append(Activity(
+            id=activity_id,
+            title=activity['text'],
+            description=activity.get('details', ''),
+            date=date
+        ))
+    return activities
+
+
+class ActivitySource(NamedTuple):
+    """
+    Where a player's Adventurer's log is read from
+
+    'parse' skips malformed entries one at a time, and raises ValueError only if the response as a whole
+    can't be parsed.
+    """
+    url: str
+    parse: Callable[[bytes], List[Activity]]
+
+    def player_url(self, player: str) -> str:
+        return self.url.format(player=urlparse.quote(player))
+
+
+SOURCES: Dict[str, ActivitySource] = {
+    'rss': ActivitySource(
+        url='http://services.runescape.com/m=adventurers-log/l=3/a=869/rssfeed?searchName={player}',
+        parse=parse_rss
+    ),
+    'runemetrics': ActivitySource(
+        url='https://apps.runescape.com/runemetrics/profile/profile?user={player}&activities=20',
+        parse=parse_runemetrics
+    ),
+}
@@ -0,0 +1,111 @@
+import asyncio
+import collections
+import csv
+import time
+from io import StringIO
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from bot.utils.http import HttpClient
+
+
+MEMBERS_URL = 'http://services.runescape.com/m=clan-hiscores/members_lite.ws?clanName={clan}'
+
+
+def normalize_name(name: str) -> str:
+    """Jagex uses non-breaking spaces in some player names, and names are case-insensitive"""
+    return name.replace('\xa0', ' ').strip().lower()
+
+
+class ClanMember(NamedTuple):
+    name: str
+    rank: str
+    exp: int
+
+
+class ClanRoster:
+    """The members of a clan, with a case-insensitive index by name"""
+
+    def __init__(self, clan_name: str, members: List[ClanMember]):
+        self.clan_name = clan_name
+        self.members = tuple(members)
+        self.index: Dict[str, ClanMember] = {normalize_name(member.name): member for member in self.members}
+
+    @classmethod
+    def from_csv(cls, clan_name: str, content: str) -> 'ClanRoster':
+        """Parses members_lite.ws, 'Clanmate, Clan Rank, Total XP, Kills' with a header row"""
+        members = []
+        for row in list(csv.reader(StringIO(content), delimiter=','))[1:]:
+            if len(row) < 3:
+                continue
+            members.append(ClanMember(name=row[0], rank=row[1], exp=int(row[2])))
+        return cls(clan_name, members)
+
+    def get(self, name: str) -> Optional[ClanMember]:
+        return self.index.get(normalize_name(name))
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self.index
+
+    def __iter__(self) -> Iterator[ClanMember]:
+        return iter(self.members)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+class ClanRosterCache:
+    """
+    Clan name -> ClanRoster, fetched from members_lite.ws at most once every 'ttl' seconds
+
+    Stale rosters are still returned right away while a single refresh runs in the background, so only the
+    first lookup of a clan waits on the Jagex API. A failed refresh keeps the stale roster around.
+    """
+
+    def __init__(self, http_client: HttpClient, ttl: float = 3600):
+        self.http_client = http_client
+        self.ttl = ttl
+        self.rosters: Dict[str, ClanRoster] = {}
+        self.fetched_at: Dict[str, float] = {}
+        self.refreshing: Dict[str, asyncio.Task] = {}
+        self.stats = collections.Counter()
+
+    async def get(self, clan_name: str) -> ClanRoster:
+        key = normalize_name(clan_name)
+        roster = self.rosters.get(key)
+        if roster is None:
+            self.stats['misses'] += 1
+            return await self.refresh(clan_name)
+        if time.monotonic() - self.fetched_at[key] > self.ttl:
+            self.stats['stale'] += 1
+            if key not in self.refreshing:
+                task = asyncio.ensure_future(self.refresh(clan_name))
+                task.add_done_callback(lambda t: t.exception() if not t.cancelled() else None)
+        else:
+            self.stats['hits'] += 1
+        return roster
+
+    async def refresh(self, clan_name: str) -> ClanRoster:
+        """Fetches the clan's roster, joining a refresh that is already running for it"""
+        key = normalize_name(clan_name)
+        task = self.refreshing.get(key)
+        if not task:
+            task = asyncio.ensure_future(self.fetch(clan_name))
+            self.refreshing[key] = task
+            task.add_done_callback(lambda _: self.refreshing.pop(key, None))
+        roster = await asyncio.shield(task)
+        self.rosters[key] = roster
+        self.fetched_at[key] = time.monotonic()
+        return roster
+
+    async def fetch(self, clan_name: str) -> ClanRoster:
+        self.stats['fetches'] += 1
+        url = MEMBERS_URL.format(clan=clan_name.replace(' ', '%20'))
+        async with self.http_client.get(url) as r:
+            r.raise_for_status()
+            return ClanRoster.from_csv(clan_name, await r.text())
+
+    def __str__(self):
+        return (
+            f"{len(self.rosters)} clãs, {self.stats['hits']} hits, {self.stats['stale']} expirados, "
+            f"{self.stats['misses']} misses, {self.stats['fetches']} downloads"
+        )
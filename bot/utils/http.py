@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+
+# Responses worth retrying, the request itself was fine
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class HostStats:
+    """Number of requests, retries and errors, and response times, of the requests made to a host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def add(self, latency: float) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def average_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def __str__(self):
+        return (f"{self.requests} requests, {self.average_latency * 1000:.0f}ms "
+                f"(máx. {self.max_latency * 1000:.0f}ms), {self.retries} retries, {self.errors} erros")
+
+
+class RequestContext:
+    """Makes 'async with client.get(...) as r:' work like it does with an aiohttp.ClientSession"""
+
+    def __init__(self, client: 'HttpClient', method: str, url: str, kwargs: dict):
+        self.client = client
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.response: Optional[aiohttp.ClientResponse] = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self.response = await self.client.request(self.method, self.url, **self.kwargs)
+        return self.response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.response.release()
+
+
+class HttpClient:
+    """
+    Bot-wide HTTP client, one aiohttp session (and connection pool) shared by every cog
+
+    Connections are kept alive and DNS lookups cached, with at most 'limit_per_host' connections open to the
+    same host. Idempotent requests that time out, fail to connect or get a 429/5xx response are retried
+    up to 'retries' times, with an exponential and jittered backoff. Response times and errors are kept
+    per host, see 'hosts'.
+
+    Usage:
+        async with bot.http_client.get(url) as r:
+            content = await r.text()
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, dns_ttl: int = 300,
+                 timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(total=30, connect=10),
+                 retries: int = 2, backoff: float = 0.5):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hosts: Dict[str, HostStats] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Created on first use, since aiohttp sessions must be created inside a coroutine"""
+        if not self._session or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    def get(self, url: str, **kwargs) -> RequestContext:
+        return RequestContext(self, 'GET', url, kwargs)
+
+    def post(self, url: str, **kwargs) -> RequestContext:
+        return RequestContext(self, 'POST', url, kwargs)
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None,
+                      **kwargs) -> aiohttp.ClientResponse:
+        """
+        Returns the response, which must be released by the caller (RequestContext does that)
+
+        Only idempotent requests are retried unless 'retries' is given.
+        """
+        if retries is None:
+            retries = self.retries if method.upper() in IDEMPOTENT_METHODS else 0
+        stats = self.hosts.setdefault(urlparse(url).netloc, HostStats())
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                stats.errors += 1
+                if attempt >= retries:
+                    raise
+            else:
+                stats.add(time.monotonic() - start)
+                if response.status not in RETRY_STATUSES or attempt >= retries:
+                    if response.status >= 500:
+                        stats.errors += 1
+                    return response
+                response.release()
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+
+    def __str__(self):
+        if not self.hosts:
+            return "Nenhum request feito"
+        return '\n'.join(f"**{host}:** {stats}" for host, stats in sorted(self.hosts.items()))
@@ -0,0 +1,93 @@
+import collections
+import hashlib
+import json
+from typing import Dict, Optional
+
+import discord
+
+
+def render_digest(content: Optional[str], embed: Optional[discord.Embed]) -> str:
+    """Hash of a message's content and embed, equal renders always give the same digest"""
+    rendered = [content or '', embed.to_dict() if embed else None]
+    return hashlib.sha1(json.dumps(rendered, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LiveMessages:
+    """
+    Keeps long-lived status messages (raids countdown, merchant stock, team lists...) up to date
+
+    Message handles are cached by ID, so a message is fetched once instead of on every update, and the digest
+    of what each message is showing is remembered, so an update that renders the same content and embed as
+    before makes no request at all. A message that was deleted is sent again the next time it changes, the
+    caller gets its new ID back and is responsible for persisting it.
+
+    Usage:
+        message_id = await bot.live_messages.update(channel, message_id, embed=embed)
+    """
+
+    def __init__(self):
+        self.messages: Dict[int, discord.Message] = {}
+        self.digests: Dict[int, str] = {}
+        self.stats = collections.Counter(fetches=0, edits=0, skipped=0, recreated=0)
+
+    async def fetch(self, channel: discord.TextChannel, message_id: int) -> Optional[discord.Message]:
+        """The cached handle of a message, fetching it the first time. Returns None if it doesn't exist"""
+        message = self.messages.get(message_id)
+        if message:
+            return message
+        self.stats['fetches'] += 1
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.errors.NotFound:
+            return None
+        self.messages[message_id] = message
+        # What the message is showing right now, a render that isn't byte for byte the same only costs one edit
+        self.digests[message_id] = render_digest(message.content, message.embeds[0] if message.embeds else None)
+        return message
+
+    async def update(
+            self,
+            channel: discord.TextChannel,
+            message_id: Optional[int],
+            content: Optional[str] = None,
+            embed: Optional[discord.Embed] = None,
+            recreate: bool = True) -> Optional[int]:
+        """
+        Makes a message show 'content' and 'embed', editing it only if that's not what it shows already
+
+        If the message doesn't exist (or message_id is None) a new one is sent and its ID returned, unless
+        'recreate' is False, in which case None is returned.
+        """
+        digest = render_digest(content, embed)
+        if message_id and self.digests.get(message_id) == digest:
+            self.stats['skipped'] += 1
+            return message_id
+        message = await self.fetch(channel, message_id) if message_id else None
+        if message:
+            if self.digests.get(message_id) == digest:
+                self.stats['skipped'] += 1
+                return message_id
+            try:
+                await message.edit(content=content, embed=embed)
+                self.stats['edits'] += 1
+                self.digests[message_id] = digest
+                return message_id
+            except discord.errors.NotFound:
+                self.forget(message_id)
+        if not recreate:
+            return None
+        sent = await channel.send(content=content, embed=embed)
+        self.stats['recreated'] += 1
+        self.messages[sent.id] = sent
+        self.digests[sent.id] = digest
+        return sent.id
+
+    def forget(self, message_id: int) -> None:
+        """Drops a message from the cache, for messages that were deleted or replaced"""
+        self.messages.pop(message_id, None)
+        self.digests.pop(message_id, None)
+
+    def __str__(self):
+        return (f"{len(self.messages)} mensagens, {self.stats['edits']} edições, "
+                f"{self.stats['skipped']} edições evitadas, {self.stats['fetches']} fetches, "
+                f"{self.stats['recreated']} recriadas")
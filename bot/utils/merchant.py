@@ -0,0 +1,138 @@
+import bisect
+import datetime
+import difflib
+import json
+import unicodedata
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+
+CATALOG_PATH = 'bot/merchant.json'
+# Future stock from the wiki, kept so restarts don't fetch it again on the same day
+STOCK_PATH = 'merchant_stock.json'
+FUTURE_STOCK_URL = 'https://runescape.wiki/w/Travelling_Merchant%27s_Shop/Future'
+
+_catalog: Optional[Dict[str, dict]] = None
+
+
+def catalog() -> Dict[str, dict]:
+    """Item name (in English, as on the wiki) -> item details from bot/merchant.json, read only once"""
+    global _catalog
+    if _catalog is None:
+        with open(CATALOG_PATH) as f:
+            _catalog = json.load(f)['stock']
+    return _catalog
+
+
+def day_str(day: datetime.date) -> str:
+    """Dates as they are written in the wiki's future stock table, e.g. '5 May 2019'"""
+    return f"{day.day} {day.strftime('%B')} {day.year}"
+
+
+def normalize(name: str) -> str:
+    """Lowercase without accents, so 'Poção' and 'pocao' are the same"""
+    name = unicodedata.normalize('NFKD', name.replace('\xa0', ' ').strip().lower())
+    return ''.join(char for char in name if not unicodedata.combining(char))
+
+
+def parse_future_stock(source: str) -> Dict[str, List[str]]:
+    """Parses the wiki's future stock table into date -> names of the 4 items sold on that date"""
+    soup = BeautifulSoup(source, 'lxml')
+    table = soup.find('table', attrs={'class': 'wikitable sticky-header'})
+    stock = {}
+    for row in table.find_all('tr'):
+        item = row.find_all('td')
+        try:
+            stock[item[0].text] = [
+                "Uncharted island map",
+                item[1].text.replace('\xa0', ''),
+                item[2].text.replace('\xa0', ''),
+                item[3].text.replace('\xa0', ''),
+            ]
+        except IndexError:
+            pass
+    return stock
+
+
+class MerchantStock:
+    """The Travelling Merchant's future stock, and the day it was fetched on"""
+
+    def __init__(self, stock: Dict[str, List[str]], fetched_on: Optional[datetime.date]):
+        self.stock = stock
+        self.fetched_on = fetched_on
+        self._index: Optional[ItemIndex] = None
+
+    @classmethod
+    def load(cls, path: str = STOCK_PATH) -> 'MerchantStock':
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data['stock'], datetime.datetime.strptime(data['fetched_on'], '%Y-%m-%d').date())
+        except (FileNotFoundError, KeyError, ValueError):
+            return cls({}, None)
+
+    def save(self, path: str = STOCK_PATH) -> None:
+        with open(path, 'w') as f:
+            json.dump({'fetched_on': self.fetched_on.isoformat(), 'stock': self.stock}, f)
+
+    def fetched_today(self, today: datetime.date) -> bool:
+        return self.fetched_on == today
+
+    @property
+    def index(self) -> 'ItemIndex':
+        if self._index is None:
+            self._index = ItemIndex(self.stock)
+        return self._index
+
+    def items(self, day: datetime.date) -> List[dict]:
+        """Details of the items sold on that day, empty if the day isn't in the stock"""
+        return [catalog()[name] for name in self.stock.get(day_str(day), [])]
+
+
+class ItemIndex:
+    """
+    Item name -> the dates (in order) it is sold on in the future stock
+
+    Items can be looked up by their English name (the wiki's) or Portuguese one (from the catalog), ignoring
+    case and accents, by the start of a name, or by a close enough name.
+    """
+
+    def __init__(self, stock: Dict[str, List[str]]):
+        self.dates: Dict[str, List[datetime.date]] = {}
+        for day, names in stock.items():
+            try:
+                date = datetime.datetime.strptime(day, '%d %B %Y').date()
+            except ValueError:
+                continue
+            for name in names:
+                self.dates.setdefault(name, []).append(date)
+        for dates in self.dates.values():
+            dates.sort()
+
+        # Normalized name -> item name as in the stock, for both the English and Portuguese names
+        self.names: Dict[str, str] = {}
+        for name in self.dates:
+            self.names[normalize(name)] = name
+            item = catalog().get(name)
+            if item:
+                self.names[normalize(item['name'])] = name
+        self.sorted_names = sorted(self.names)
+
+    def search(self, query: str) -> Optional[str]:
+        """Returns the name of the item that best matches the query, or None"""
+        query = normalize(query)
+        if query in self.names:
+            return self.names[query]
+        position = bisect.bisect_left(self.sorted_names, query)
+        if position < len(self.sorted_names) and self.sorted_names[position].startswith(query):
+            return self.names[self.sorted_names[position]]
+        matches = difflib.get_close_matches(query, self.sorted_names, n=1, cutoff=0.6)
+        if matches:
+            return self.names[matches[0]]
+        return None
+
+    def upcoming(self, name: str, today: datetime.date) -> List[datetime.date]:
+        """Dates from today on that the item is sold"""
+        dates = self.dates.get(name, [])
+        return dates[bisect.bisect_left(dates, today):]
@@ -0,0 +1,64 @@
+import random
+from typing import Dict, Iterable, List
+
+
+class PollState:
+    __slots__ = ('interval', 'next_poll', 'last_activity', 'activity_count')
+
+    def __init__(self, interval: float, next_poll: float):
+        self.interval = interval
+        self.next_poll = next_poll
+        self.last_activity = None
+        self.activity_count = 0
+
+
+class PollScheduler:
+    """
+    Decides which players are due to have their feed polled, polling active players often and dormant ones rarely
+
+    Every player starts at 'min_interval' seconds between polls. Each poll that finds nothing new multiplies
+    their interval by 'backoff' (up to 'max_interval'), and a poll that finds new activity resets it back to
+    'min_interval'.
+    A small random jitter keeps players that were backed off together from all becoming due at the same time.
+
+    Time is always passed in by the caller (e.g. time.monotonic()), so the scheduler can be simulated.
+    """
+
+    def __init__(self, min_interval: float = 60, max_interval: float = 6 * 60 * 60, backoff: float = 1.5,
+                 jitter: float = 0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.players: Dict[str, PollState] = {}
+
+    def retain(self, players: Iterable[str], now: float) -> None:
+        """Starts tracking new players (due right away) and forgets the ones not in 'players' anymore"""
+        players = set(players)
+        for player in players - self.players.keys():
+            self.players[player] = PollState(self.min_interval, now)
+        for player in self.players.keys() - players:
+            del self.players[player]
+
+    def due(self, now: float, limit: int) -> List[str]:
+        """Up to 'limit' players whose next poll is due, the most overdue first"""
+        due = [(state.next_poll, player) for player, state in self.players.items() if state.next_poll <= now]
+        due.sort()
+        return [player for _, player in due[:limit]]
+
+    def record(self, player: str, now: float, active: bool) -> None:
+        """Schedules the next poll of a player after polling them, 'active' if new activity was found"""
+        state = self.players.get(player)
+        if not state:
+            return
+        if active:
+            state.interval = self.min_interval
+            state.last_activity = now
+            state.activity_count += 1
+        else:
+            state.interval = min(state.interval * self.backoff, self.max_interval)
+        state.next_poll = now + state.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def __str__(self):
+        active = sum(1 for state in self.players.values() if state.interval <= self.min_interval)
+        return f"{len(self.players)} jogadores, {active} ativos"
@@ -0,0 +1,24 @@
+import asyncio
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests made to the same host so no more than 'rate' of them start every 'per' seconds
+
+    Each call to wait() reserves the next free slot for its host, so concurrent callers are let through
+    in the order they asked, one slot apart.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.interval = per / rate
+        self.next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        now = asyncio.get_event_loop().time()
+        slot = max(now, self.next_slot.get(host, 0.0))
+        self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
@@ -0,0 +1,58 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from bot.settings import Snapshot
+
+
+WIKIA_URL = 'runescape.fandom.com/wiki/'
+NEW_WIKI_URL = 'rs.wiki/w/'
+
+
+class Route(NamedTuple):
+    """Result of classifying a message, every field is computed in the same pass over its content"""
+    mention: bool = False
+    wiki_urls: Tuple[str, ...] = ()
+    team: Optional[Tuple[str, str]] = None  # (team_id, 'join' or 'leave')
+
+
+EMPTY_ROUTE = Route()
+
+
+class MessageRouter:
+    """
+    Classifies messages with a single pre-compiled pattern built from the bot's settings
+
+    Detects, in one scan of the message content:
+        - Unauthorized mentions (@everyone, @here and the 'membro'/'convidado' roles)
+        - Links to the old RuneScape Wikia
+        - Team join/leave messages ('in 10', 'out raids', ...)
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.membro = snapshot.role.get('membro')
+        self.convidado = snapshot.role.get('convidado')
+
+        mentions = ['@everyone', '@here', f"<@&{self.membro}>", f"<@&{self.convidado}>"]
+        self.pattern = re.compile(
+            r'(?P<team>^(?i:(?P<mode>in|out) (?P<team_id>\d+|raids)))'
+            rf'|(?P<mention>{"|".join(re.escape(mention) for mention in mentions)})'
+            rf'|(?P<wiki>http\S*{re.escape(WIKIA_URL)}\S*)'
+        )
+
+    def classify(self, content: str) -> Route:
+        mention = False
+        wiki_urls: List[str] = []
+        team = None
+        for match in self.pattern.finditer(content):
+            kind = match.lastgroup
+            if kind == 'mention':
+                mention = True
+            elif kind == 'wiki':
+                wiki_urls.append(match.group().replace(WIKIA_URL, NEW_WIKI_URL))
+            else:
+                mode = 'join' if match.group('mode').lower() == 'in' else 'leave'
+                team = (match.group('team_id').lower(), mode)
+        if not (mention or wiki_urls or team):
+            return EMPTY_ROUTE
+        return Route(mention=mention, wiki_urls=tuple(wiki_urls), team=team)
@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bot.orm.models import ScheduledJob
+
+
+# Given the time a job last ran (or was due), returns the next time it should run, always after that.
+# Returning None ends the job.
+Rule = Callable[[datetime.datetime], Optional[datetime.datetime]]
+
+
+def every(interval: datetime.timedelta, start: datetime.datetime = datetime.datetime(2019, 1, 1)) -> Rule:
+    """Runs at start + n * interval, e.g. every(timedelta(days=1)) runs at every midnight UTC"""
+    def rule(after: datetime.datetime) -> datetime.datetime:
+        periods = (after - start) // interval + 1
+        return start + periods * interval
+    return rule
+
+
+class Job:
+    def __init__(self, name: str, callback: Callable[[], Awaitable], when: datetime.datetime,
+                 rule: Optional[Rule] = None, catch_up: Optional[datetime.timedelta] = None):
+        self.name = name
+        self.callback = callback
+        self.when = when
+        self.rule = rule
+        self.catch_up = catch_up
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    Timer heap of the bot's time-based jobs, run by a single task that sleeps until the next one is due
+
+    Recurring jobs are given a Rule that returns their next run time. Jobs with a 'catch_up' window have their
+    last run stored in the database: if a job was missed while the bot was offline, and the missed run is within
+    that window, it is run once as soon as it's scheduled again. Older missed runs are skipped.
+
+    Usage:
+        bot.scheduler.schedule('merchant', self.merchant_reset, every(timedelta(days=1)), catch_up=timedelta(hours=1))
+        bot.scheduler.call_at('merchant_retry', now + timedelta(minutes=15), self.merchant_reset)
+        bot.scheduler.cancel('merchant')
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.heap: List[Tuple[datetime.datetime, int, Job]] = []
+        self.jobs: Dict[str, Job] = {}
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        # Job name -> last time it ran, loaded once when the bot starts
+        self.last_runs: Dict[str, datetime.datetime] = {}
+
+    def load(self, session) -> None:
+        self.last_runs = {job.name: job.last_run for job in session.query(ScheduledJob)}
+
+    def push(self, job: Job) -> None:
+        old = self.jobs.get(job.name)
+        if old:
+            old.cancelled = True
+        self.jobs[job.name] = job
+        heapq.heappush(self.heap, (job.when, next(self.counter), job))
+        self.wakeup.set()
+
+    def schedule(self, name: str, callback: Callable[[], Awaitable], rule: Rule,
+                 catch_up: Optional[datetime.timedelta] = None) -> None:
+        """Runs callback() at every time given by the rule, replacing any job with the same name"""
+        now = datetime.datetime.utcnow()
+        when = rule(now)
+        if catch_up:
+            last_run = self.last_runs.get(name)
+            if last_run:
+                missed = None
+                due = rule(last_run)
+                while due and due <= now:
+                    missed = due
+                    due = rule(due)
+                if missed and now - missed <= catch_up:
+                    when = now
+        if when:
+            self.push(Job(name, callback, when, rule, catch_up))
+        else:
+            self.cancel(name)
+
+    def call_at(self, name: str, when: datetime.datetime, callback: Callable[[], Awaitable]) -> None:
+        """Runs callback() once at 'when', replacing any job with the same name"""
+        self.push(Job(name, callback, when))
+
+    def cancel(self, name: str) -> None:
+        job = self.jobs.pop(name, None)
+        if job:
+            job.cancelled = True
+
+    def upcoming(self, limit: int = 10) -> List[Tuple[str, datetime.datetime]]:
+        """(name, time) of the next jobs to run"""
+        return [(job.name, when) for when, _, job in heapq.nsmallest(limit, self.heap) if not job.cancelled]
+
+    @staticmethod
+    def record_run(session, name: str, when: datetime.datetime) -> None:
+        job = session.query(ScheduledJob).filter_by(name=name).first()
+        if not job:
+            job = ScheduledJob(name=name)
+            session.add(job)
+        job.last_run = when
+
+    async def run(self) -> None:
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            delay = (self.heap[0][0] - datetime.datetime.utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    # Woken up early if a job is pushed that may be due sooner
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, job = heapq.heappop(self.heap)
+            when = job.rule(max(job.when, datetime.datetime.utcnow())) if job.rule else None
+            if when:
+                self.push(Job(job.name, job.callback, when, job.rule, job.catch_up))
+            else:
+                self.jobs.pop(job.name, None)
+            self.bot.loop.create_task(self.run_job(job))
+
+    async def run_job(self, job: Job) -> None:
+        try:
+            if job.catch_up:
+                # Last runs are only read to catch up on missed runs, so the other jobs don't write theirs
+                self.last_runs[job.name] = datetime.datetime.utcnow()
+                await self.bot.run_db(self.record_run, job.name, self.last_runs[job.name])
+            await job.callback()
+        except Exception as e:
+            logging.error(f"Error running scheduled job '{job.name}'")
+            await self.bot.send_logs(e, traceback.format_exc())
+
+    def __str__(self):
+        upcoming = self.upcoming()
+        if not upcoming:
+            return "Nenhuma tarefa agendada"
+        return '\n'.join(f"**{name}:** {when:%d/%m %H:%M:%S} UTC" for name, when in upcoming)
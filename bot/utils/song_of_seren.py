@@ -0,0 +1,61 @@
+import bisect
+import datetime
+import json
+from typing import Dict, List, NamedTuple, Optional
+
+
+TIMELINE_PATH = 'bot/song_of_seren.json'
+
+
+class Rotation(NamedTuple):
+    start: datetime.datetime
+    end: datetime.datetime
+    type: str
+
+
+class SongOfSerenTimeline:
+    """
+    Song of Seren rotations, read from bot/song_of_seren.json, sorted by start time
+
+    Besides the rotations, the data file holds the role, color, skills and bonuses of each rotation type and
+    the emoji of each skill.
+    """
+
+    def __init__(self, rotations: List[Rotation], types: Dict[str, dict], emoji: Dict[str, str]):
+        self.rotations = sorted(rotations)
+        self.starts = [rotation.start for rotation in self.rotations]
+        self.types = types
+        self.emoji = emoji
+
+    @classmethod
+    def load(cls, path: str = TIMELINE_PATH) -> 'SongOfSerenTimeline':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        duration = datetime.timedelta(hours=data['rotation_hours'])
+        rotations = []
+        for start, rotation_type in data['rotations']:
+            start = datetime.datetime.strptime(start, '%Y-%m-%d %H:%M')
+            rotations.append(Rotation(start, start + duration, rotation_type))
+        return cls(rotations, data['types'], data['emoji'])
+
+    def current(self, now: datetime.datetime) -> Optional[Rotation]:
+        """The rotation active at 'now', None outside of the event or between rotations"""
+        position = bisect.bisect_right(self.starts, now) - 1
+        if position >= 0 and now < self.rotations[position].end:
+            return self.rotations[position]
+        return None
+
+    def next(self, now: datetime.datetime) -> Optional[Rotation]:
+        """The first rotation starting after 'now'"""
+        position = bisect.bisect_right(self.starts, now)
+        return self.rotations[position] if position < len(self.rotations) else None
+
+    def next_change(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        """The first time after 'after' that a rotation starts or ends, None once the event is over"""
+        position = bisect.bisect_right(self.starts, after)
+        candidates = []
+        if position < len(self.rotations):
+            candidates.append(self.rotations[position].start)
+        if position > 0 and self.rotations[position - 1].end > after:
+            candidates.append(self.rotations[position - 1].end)
+        return min(candidates) if candidates else None
@@ -0,0 +1,65 @@
+from typing import Any, Dict
+
+from bot.orm.models import RaidsState, AdvLogState, AmigoSecretoState, SongOfSerenState, MerchantState
+
+
+class SingletonState:
+    """
+    Write-through cache of a table that holds a single row, like RaidsState
+
+    The row is read (and created with 'defaults' if it doesn't exist) when the bot starts, and reads are
+    served from memory afterwards. Changes must go through update(), which commits them to the database
+    before updating the cached values.
+
+    Usage:
+        if bot.state.raids.notifications:
+            ...
+        await bot.state.raids.update(bot, notifications=False)
+    """
+
+    def __init__(self, model, **defaults):
+        self.model = model
+        self.defaults = defaults
+        self.values: Dict[str, Any] = dict(defaults)
+
+    def __getattr__(self, name: str):
+        try:
+            return self.__dict__['values'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def row(self, session):
+        row = session.query(self.model).first()
+        if not row:
+            row = self.model(**self.defaults)
+            session.add(row)
+        return row
+
+    def load(self, session) -> None:
+        row = self.row(session)
+        session.flush()
+        self.values = {column.name: getattr(row, column.name) for column in self.model.__table__.columns}
+
+    def write(self, session, **changes) -> None:
+        row = self.row(session)
+        for name, value in changes.items():
+            setattr(row, name, value)
+
+    async def update(self, bot, **changes) -> None:
+        await bot.run_db(self.write, **changes)
+        self.values.update(changes)
+
+
+class BotState:
+    """The bot's singleton state rows, see SingletonState"""
+
+    def __init__(self):
+        self.raids = SingletonState(RaidsState, notifications=True, time_to_next_message=None)
+        self.advlog = SingletonState(AdvLogState, messages=True)
+        self.amigo_secreto = SingletonState(AmigoSecretoState, activated=False)
+        self.sos = SingletonState(SongOfSerenState, activated=True, message_id=None)
+        self.merchant = SingletonState(MerchantState, message_id=562120346979794944)
+
+    def load(self, session) -> None:
+        for state in (self.raids, self.advlog, self.amigo_secreto, self.sos, self.merchant):
+            state.load(session)
@@ -1,7 +1,12 @@
+import asyncio
+import datetime
 import traceback
+from typing import Dict, List, Optional
 
 import discord
+from sqlalchemy.orm import joinedload
 
+from bot.orm.db import AsyncSession
 from bot.orm.models import Team, Player, BotMessage
 from bot.utils.tools import has_any_role, separator
 
@@ -14,111 +19,166 @@ class WrongChannelError(Exception):
     pass
 
 
-def secondary_full(team: Team, session) -> (int, bool):
-    """Checks if a team has hit its limit for number of players that only have its secondary role requirement"""
-    secondary_count = session.query(Player).filter_by(team=team.id, secondary=True).count()
-    if not team.secondary_limit:
-        # If the team does not have a secondary role limit, then it can't ever reach that
-        return 0, False
-    return secondary_count, (secondary_count >= team.secondary_limit)
-
-
-def add_to_team(author: discord.Member, team: Team, substitute: bool, secondary: bool, session) -> None:
-    """Adds a Player to a Team"""
-    added_player = Player(player_id=str(author.id), team=team.id, substitute=substitute, secondary=secondary)
-    session.add(added_player)
-    session.commit()
-
-
-def first_substitute(team: Team, session, exclude: int) -> Player or None:
-    return session.query(Player).filter(
-        Player.substitute == True,  # noqa: E712
-        Player.player_id != str(exclude),
-        Player.team == team.id
-    ).first()
-
-
-def remove_from_team(player_id: int, team: Team, session) -> None:
-    session.query(Player).filter_by(player_id=str(player_id), team=team.id).delete()
-    session.commit()
-
-
-def team_count(team: Team, session) -> int:
-    return session.query(Player).filter_by(team=team.id).count()
+class Roster:
+    """
+    A Team and all of its Players, loaded with a single query
 
+    All counts and membership checks are computed in memory, and changes made through add/remove
+    are reflected right away, so a whole join or leave can be handled without querying the Players again.
+    """
 
-async def update_team_message(message: discord.Message, team: Team, prefix: str, session) -> None:
+    def __init__(self, team: Team, players: List[Player]):
+        self.team = team
+        self.players = sorted(players, key=lambda player: player.id or 0)
+
+    @classmethod
+    def load(cls, session, team_id: str) -> Optional['Roster']:
+        team: Team = session.query(Team).options(joinedload(Team.players)).filter_by(team_id=team_id).first()
+        if not team:
+            return None
+        return cls(team, list(team.players))
+
+    @property
+    def main_players(self) -> List[Player]:
+        return [player for player in self.players if not player.substitute]
+
+    @property
+    def substitutes(self) -> List[Player]:
+        return [player for player in self.players if player.substitute]
+
+    @property
+    def count(self) -> int:
+        """Number of players in the Team that aren't substitutes"""
+        return len(self.main_players)
+
+    @property
+    def secondary_count(self) -> int:
+        return sum(1 for player in self.players if player.secondary)
+
+    def is_full(self) -> bool:
+        """Verifies if a team is full or not"""
+        return self.count >= self.team.size
+
+    def secondary_full(self) -> bool:
+        """Checks if a team has hit its limit for number of players that only have its secondary role requirement"""
+        if not self.team.secondary_limit:
+            # If the team does not have a secondary role limit, then it can't ever reach that
+            return False
+        return self.secondary_count >= self.team.secondary_limit
+
+    def player(self, player_id: int) -> Optional[Player]:
+        """Returns the Player in the Team with the given discord ID, if there is one"""
+        for player in self.players:
+            if player.player_id == player_id:
+                return player
+        return None
+
+    def in_team(self, player_id: int) -> bool:
+        """Checks if a player is in a team"""
+        return self.player(player_id) is not None
+
+    def first_substitute(self, exclude: int) -> Optional[Player]:
+        for player in self.substitutes:
+            if player.player_id != exclude:
+                return player
+        return None
+
+    def add(self, author: discord.Member, substitute: bool, secondary: bool, session) -> Player:
+        """Adds a Player to a Team"""
+        added_player = Player(player_id=author.id, team=self.team.id, substitute=substitute, secondary=secondary)
+        session.add(added_player)
+        self.players.append(added_player)
+        return added_player
+
+    def remove(self, player: Player, session) -> None:
+        session.delete(player)
+        self.players.remove(player)
+
+
+def team_embed(roster: Roster, prefix: str) -> discord.Embed:
+    team = roster.team
     embed_description = f"Marque presença no <#{team.invite_channel_id}>\n Criador: <@{team.author_id}>"
     requisito = ""
     requisito2 = ""
     if team.role:
         requisito = f"Requisito: <@&{team.role}>\n"
     if team.role_secondary:
-        count = session.query(Player).filter_by(team=team.id, secondary=True).count()
+        count = roster.secondary_count
         limit = "" if not team.secondary_limit else f"({count}/{team.secondary_limit})"
         requisito2 = f"Requisito Secundário: <@&{team.role_secondary}> {limit}\n\n"
 
     embed_description = f"{requisito}{requisito2}{embed_description}"
 
-    team_embed = discord.Embed(
-        title=f"__{team.title}__ - {team_count(team, session)}/{team.size}",
+    embed = discord.Embed(
+        title=f"__{team.title}__ - {len(roster.players)}/{team.size}",
         description=embed_description,
         color=discord.Color.purple()
     )
     footer = f"Digite '{prefix}del {team.team_id}' para excluir o time. (Criador do time ou Admin e acima)"
-    team_embed.set_footer(text=footer)
-
-    players = session.query(Player).filter_by(team=team.id)
-    index = 0
-    if players:
-        for player in players:
-            if not player.substitute:
-                player_role = f"({player.role})" if player.role else ""
-                player_value = (f"{index + 1}- <@{player.player_id}> {player_role} "
-                                f"{'***(Secundário)***' if player.secondary else ''}")
-                team_embed.add_field(name=separator, value=player_value, inline=False)
-                index += 1
-    if players:
-        for player in players:
-            if player.substitute:
-                player_role = f"({player.role})" if player.role else ""
-                player_value = (f"- <@{player.player_id}> {player_role} ***(Substituto)*** "
-                                f"{'***(Secundário)***' if player.secondary else ''}")
-                team_embed.add_field(name=separator, value=player_value, inline=False)
-    await message.edit(embed=team_embed)
-
-
-async def manage_team(team_id: str, client, message: discord.Message, mode: str) -> None:
+    embed.set_footer(text=footer)
+
+    for index, player in enumerate(roster.main_players):
+        player_role = f"({player.role})" if player.role else ""
+        player_value = (f"{index + 1}- <@{player.player_id}> {player_role} "
+                        f"{'***(Secundário)***' if player.secondary else ''}")
+        embed.add_field(name=separator, value=player_value, inline=False)
+    for player in roster.substitutes:
+        player_role = f"({player.role})" if player.role else ""
+        player_value = (f"- <@{player.player_id}> {player_role} ***(Substituto)*** "
+                        f"{'***(Secundário)***' if player.secondary else ''}")
+        embed.add_field(name=separator, value=player_value, inline=False)
+    return embed
+
+
+async def update_team_message(client, roster: Roster) -> bool:
+    """
+    Shows the Team's current Players in its team message, the message is only edited if they changed
+
+    Returns False if the team message (or its channel) doesn't exist anymore.
+    """
+    team = roster.team
+    team_channel: discord.TextChannel = client.get_channel(team.team_channel_id)
+    if not team_channel:
+        return False
+    embed = team_embed(roster, client.setting.prefix)
+    message_id = await client.live_messages.update(team_channel, team.team_message_id, embed=embed, recreate=False)
+    return message_id is not None
+
+
+async def manage_team(team_id: str, client, message: discord.Message, mode: str, manager=None) -> None:
     """
     Manages a join or leave for a Team
 
+    The Team and its Players are loaded once into a Roster, and the whole join or leave is written in a
+    single transaction when the session is closed.
+
     mode: can be 'join' or 'leave'
+    manager: TeamManager used to coalesce edits of the team message, the message is edited right away if not passed
     """
-    with client.db_session() as session:
+    async with client.async_session() as db:
+        session = db.session
         try:
-            team: Team = session.query(Team).filter_by(team_id=team_id).first()
-            if not team:
+            roster = await db.run(Roster.load, team_id)
+            if not roster:
                 raise TeamNotFoundError
-            if int(team.invite_channel_id) != message.channel.id:
+            team = roster.team
+            if team.invite_channel_id != message.channel.id:
                 raise WrongChannelError
             await message.delete()
-            current_players = session.query(Player).filter_by(team=team.id)
-            substitutes = session.query(Player).filter_by(team=team.id, substitute=True)
-            invite_channel: discord.TextChannel = client.get_channel(int(team.invite_channel_id))
-            team_channel: discord.TextChannel = client.get_channel(int(team.team_channel_id))
+            invite_channel: discord.TextChannel = client.get_channel(team.invite_channel_id)
+            team_channel: discord.TextChannel = client.get_channel(team.team_channel_id)
             if not invite_channel or not team_channel:
-                return await delete_team(session, team, client)
-            try:
-                team_message = await team_channel.fetch_message(int(team.team_message_id))
-            except discord.errors.NotFound:
-                return await delete_team(session, team, client)
+                return await delete_team(db, team, client)
+            team_message = await client.live_messages.fetch(team_channel, team.team_message_id)
+            if not team_message:
+                return await delete_team(db, team, client)
 
             text = ''
             no_perm_embed = None
 
             if mode == 'join':
-                team_role = None if not team.role else int(team.role)
-                secondary_team_role = None if not team.role_secondary else int(team.role_secondary)
+                team_role = team.role
+                secondary_team_role = team.role_secondary
 
                 has_main = has_any_role(message.author, team_role)  # Has main role requirement
                 has_secondary = has_any_role(message.author, secondary_team_role)  # Has secondary role requirement
@@ -127,21 +187,21 @@ async def manage_team(team_id: str, client, message: discord.Message, mode: str)
                 is_secondary = True if (has_secondary and not has_main) else False
 
                 if is_secondary:
-                    _, is_team_full = secondary_full(team, session)
+                    is_team_full = roster.secondary_full()
                 else:
-                    is_team_full = is_full(team, session)
+                    is_team_full = roster.is_full()
 
-                if in_team(message.author.id, team, session):
+                if roster.in_team(message.author.id):
                     text = 'já está no time'
                 elif has_any or not team_role:
-                    add_to_team(message.author, team, substitute=is_team_full, secondary=is_secondary, session=session)
+                    roster.add(message.author, substitute=is_team_full, secondary=is_secondary, session=session)
                     text = 'entrou ***como substituto*** no time' if is_team_full else 'entrou no time'
                 else:
                     description = f"{message.author.mention}, você precisa ter o cargo <@&{team.role}>"
                     if team.role_secondary:
                         description = f"{description} ou o cargo <@&{team.role_secondary}>"
                     description = (f"{description} para entrar no Time '{team.title}' "
-                                   f"({current_players.count() - substitutes.count()}/{team.size})\n"
+                                   f"({roster.count}/{team.size})\n"
                                    f"(*`{message.content}`*)")
                     no_perm_embed = discord.Embed(
                         title=f"__Permissões insuficientes__",
@@ -150,34 +210,31 @@ async def manage_team(team_id: str, client, message: discord.Message, mode: str)
                     )
 
             elif mode == 'leave':
-                if in_team(message.author.id, team, session):
+                leaving = roster.player(message.author.id)
+                if leaving:
                     text = 'saiu do time'
-                    substitute: Player = first_substitute(team, session, message.author.id)
-                    is_substitute = session.query(Player).filter_by(
-                        player_id=str(message.author.id), team=team.id
-                    ).first().substitute
+                    substitute: Player = roster.first_substitute(message.author.id)
                     # If the person leaving is not a substitute and there is one available, then
                     # make that substitute not be a substitute anymore
-                    if substitute and not is_substitute:
-                        if substitute.secondary and secondary_full(team, session)[1]:
+                    if substitute and not leaving.substitute:
+                        if substitute.secondary and roster.secondary_full():
                             pass
                         else:
                             substitute.substitute = False
-                            session.commit()
                             _text = (f"<@{substitute.player_id}> não é mais um substituto do time "
                                      f"**[{team.title}]({team_message.jump_url})** "
-                                     f"({current_players.count() - substitutes.count() - 1}/{team.size})")
+                                     f"({roster.count - 1}/{team.size})")
                             embed = discord.Embed(title='', description=_text, color=discord.Color.green())
                             msg = await invite_channel.send(content=f"<@{substitute.player_id}>", embed=embed)
                             session.add(BotMessage(message_id=msg.id, team=team.id))
-                    remove_from_team(message.author.id, team, session)
+                    roster.remove(leaving, session)
                 else:
                     text = 'já não estava no time'
             if no_perm_embed:
                 sent_message = await invite_channel.send(embed=no_perm_embed)
             else:
                 _text = (f"{message.author.mention} {text} **[{team.title}]({team_message.jump_url})** "
-                         f"({current_players.count() - substitutes.count()}/{team.size})\n\n *`({message.content})`*")
+                         f"({roster.count}/{team.size})\n\n *`({message.content})`*")
                 if mode == 'leave':
                     embed_color = discord.Color.red()
                 else:
@@ -187,13 +244,11 @@ async def manage_team(team_id: str, client, message: discord.Message, mode: str)
                 sent_message = await invite_channel.send(embed=embed)
 
             session.add(BotMessage(message_id=sent_message.id, team=team.id))
-            session.commit()
 
-            try:
-                await update_team_message(team_message, team, client.setting.prefix, session)
-            except discord.errors.NotFound:
-                session.delete(team)
-                session.commit()
+            if manager:
+                manager.schedule_edit(team.team_id, team.team_message_id)
+            elif not await update_team_message(client, roster):
+                await db.run(lambda session: session.delete(team))
 
         except TeamNotFoundError:
             raise TeamNotFoundError
@@ -203,45 +258,133 @@ async def manage_team(team_id: str, client, message: discord.Message, mode: str)
             await client.send_logs(e, traceback.format_exc())
 
 
-def is_full(team: Team, session) -> bool:
-    """Verifies if a team is full or not"""
-    count = session.query(Player).filter_by(team=team.id, substitute=False).count()
-    return count >= team.size
+# Discord only bulk deletes messages newer than 14 days, keep a margin for clock differences
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+BULK_DELETE_MAX_COUNT = 100
 
 
-def in_team(author_id: int, team: Team, session):
-    """Checks if a player is in a team"""
-    current_players = session.query(Player).filter_by(team=team.id)
-    return author_id in [int(player.player_id) for player in current_players]
+async def delete_messages(channel: discord.TextChannel, message_ids: List[int], concurrency: int = 5) -> None:
+    """
+    Deletes messages by ID, without fetching them first
 
+    Messages recent enough are bulk deleted in chunks of 100, older ones are deleted one by one, concurrently
+    but limited to 'concurrency' requests at a time (discord.py also waits on the rate limit buckets).
+    """
+    oldest_bulk = datetime.datetime.utcnow() - BULK_DELETE_MAX_AGE
+    recent = [message_id for message_id in message_ids if discord.utils.snowflake_time(message_id) > oldest_bulk]
+    old = [message_id for message_id in message_ids if discord.utils.snowflake_time(message_id) <= oldest_bulk]
+
+    for index in range(0, len(recent), BULK_DELETE_MAX_COUNT):
+        chunk = recent[index:index + BULK_DELETE_MAX_COUNT]
+        try:
+            await channel.delete_messages([discord.Object(id=message_id) for message_id in chunk])
+        except discord.errors.HTTPException:
+            # A single unknown message makes the whole bulk delete fail, retry the chunk one message at a time
+            old.extend(chunk)
 
-async def delete_team(session, team: Team, client):
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def delete(message_id: int):
+        async with limiter:
+            try:
+                # A single message is deleted with the regular delete message endpoint
+                await channel.delete_messages([discord.Object(id=message_id)])
+            except discord.errors.HTTPException:
+                pass
+
+    await asyncio.gather(*[delete(message_id) for message_id in old])
+
+
+async def delete_team(db: AsyncSession, team: Team, client):
+    """Deletes a Team and its messages, the deletion is committed when the caller's AsyncSession ends"""
     try:
-        team_channel = client.get_channel(int(team.team_channel_id))
-        invite_channel = client.get_channel(int(team.invite_channel_id))
+        team_channel = client.get_channel(team.team_channel_id)
+        invite_channel = client.get_channel(team.invite_channel_id)
     except Exception:
-        session.delete(team)
-        session.commit()
+        await db.run(lambda session: session.delete(team))
         return
+    to_delete = []
+    client.live_messages.forget(team.team_message_id)
+    if team_channel:
+        to_delete.append(delete_messages(team_channel, [team.team_message_id]))
+    if invite_channel:
+        qs = await db.run(lambda session: session.query(BotMessage.message_id).filter_by(team=team.id).all())
+        message_ids = [team.invite_message_id] + [message_id for message_id, in qs]
+        to_delete.append(delete_messages(invite_channel, message_ids))
     try:
-        team_message = await team_channel.fetch_message(int(team.team_message_id))
-        await team_message.delete()
-    except Exception:
-        pass
-    try:
-        invite_message = await invite_channel.fetch_message(int(team.invite_message_id))
-        await invite_message.delete()
-    except Exception:
-        pass
-    try:
-        messages_to_delete = []
-        qs = session.query(BotMessage).filter_by(team=team.id)
-        if qs:
-            for message in qs:
-                to_delete = await invite_channel.fetch_message(message.message_id)
-                messages_to_delete.append(to_delete)
-            await invite_channel.delete_messages(messages_to_delete)
+        await asyncio.gather(*to_delete)
     except Exception:
         pass
-    session.delete(team)
-    session.commit()
+    # Deleting a Team loads its Players and BotMessages to cascade the deletion, so it's run in the executor
+    await db.run(lambda session: session.delete(team))
+
+
+class TeamManager:
+    """
+    Serializes join/leave requests of each Team and coalesces the edits of their team messages
+
+    Every Team gets its own queue and worker task, so requests for the same Team are applied one at a time and
+    in the order they were received, while different Teams are still handled concurrently. Edits of the team
+    message are debounced: a burst of joins results in one or two edits instead of one per join.
+    """
+
+    def __init__(self, client, edit_delay: float = 2.0, idle_timeout: float = 60.0):
+        self.client = client
+        self.edit_delay = edit_delay
+        self.idle_timeout = idle_timeout
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.edits: Dict[str, asyncio.Task] = {}
+        self.dirty: Dict[str, int] = {}
+
+    async def submit(self, team_id: str, message: discord.Message, mode: str) -> None:
+        """Queues a join or leave for a Team and waits for it to be applied, re-raising any error from manage_team"""
+        future = self.client.loop.create_future()
+        queue = self.queues.get(team_id)
+        if queue is None:
+            queue = self.queues[team_id] = asyncio.Queue()
+            self.client.loop.create_task(self.worker(team_id, queue))
+        queue.put_nowait((message, mode, future))
+        await future
+
+    async def worker(self, team_id: str, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                message, mode, future = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                # wait_for awaits the cancellation of queue.get() before raising, so a request may have been
+                # queued in the meantime. Checking and deleting the queue has no await in between, so once it's
+                # empty here submit() creates a new queue and worker for any later request
+                if not queue.empty():
+                    continue
+                del self.queues[team_id]
+                return
+            try:
+                await manage_team(team_id=team_id, client=self.client, message=message, mode=mode, manager=self)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
+
+    def schedule_edit(self, team_id: str, team_message_id: int) -> None:
+        """Marks a team message as outdated, editing it after a short delay if no edit is pending already"""
+        self.dirty[team_id] = team_message_id
+        edit = self.edits.get(team_id)
+        if not edit or edit.done():
+            self.edits[team_id] = self.client.loop.create_task(self.flush_edits(team_id))
+
+    async def flush_edits(self, team_id: str) -> None:
+        while team_id in self.dirty:
+            await asyncio.sleep(self.edit_delay)
+            team_message_id = self.dirty.pop(team_id)
+            try:
+                async with self.client.async_session() as db:
+                    roster = await db.run(Roster.load, team_id)
+                    if not roster or roster.team.team_message_id != team_message_id:
+                        continue
+                    if not await update_team_message(self.client, roster):
+                        await db.run(lambda session: session.delete(roster.team))
+            except Exception as e:
+                await self.client.send_logs(e, traceback.format_exc())
+        self.edits.pop(team_id, None)
@@ -0,0 +1,154 @@
+import asyncio
+import collections
+import json
+import logging
+from typing import Deque, Dict, Optional
+
+import discord
+
+from bot.orm.models import OutboxMessage
+
+
+# Discord accepts at most 10 embeds in a single webhook message
+MAX_EMBEDS = 10
+
+
+class WebhookPoster:
+    """
+    Queues embeds per channel and posts them through a webhook of that channel, up to 10 embeds per message
+
+    Instead of sleeping a fixed amount between messages, the poster waits only when Discord's rate-limit
+    headers say the webhook's bucket is exhausted (or when a 429 is returned). Embeds are posted in the
+    order they were queued. Channels where a webhook can't be used fall back to regular messages.
+    """
+
+    def __init__(self, bot: discord.Client, name: str):
+        self.bot = bot
+        self.name = name
+        self.queues: Dict[int, Deque[discord.Embed]] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        self.webhooks: Dict[int, Optional[str]] = {}
+        self.stats = collections.Counter(embeds=0, requests=0, rate_limited=0)
+
+    def post(self, channel: discord.TextChannel, embed: discord.Embed) -> None:
+        self.queues.setdefault(channel.id, collections.deque()).append(embed)
+        worker = self.workers.get(channel.id)
+        if not worker or worker.done():
+            self.workers[channel.id] = self.bot.loop.create_task(self.worker(channel))
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def worker(self, channel: discord.TextChannel) -> None:
+        queue = self.queues[channel.id]
+        while queue:
+            batch = [queue.popleft() for _ in range(min(MAX_EMBEDS, len(queue)))]
+            try:
+                url = await self.webhook_url(channel)
+                if url and not await self.execute(url, batch):
+                    # The webhook was deleted, a new one is looked up for the same batch
+                    del self.webhooks[channel.id]
+                    url = await self.webhook_url(channel)
+                    if url:
+                        await self.execute(url, batch)
+                if not url:
+                    for embed in batch:
+                        await channel.send(embed=embed)
+                self.stats['embeds'] += len(batch)
+            except Exception as e:
+                # The whole batch is dropped rather than retried forever, same as a failed channel.send()
+                logging.error(f"Error posting {len(batch)} embeds to channel {channel.id}: {e}")
+
+    async def webhook_url(self, channel: discord.TextChannel) -> Optional[str]:
+        """Finds (or creates) the poster's webhook in the channel, None if the bot isn't allowed to manage them"""
+        if channel.id in self.webhooks:
+            return self.webhooks[channel.id]
+        url = None
+        try:
+            webhook = discord.utils.get(await channel.webhooks(), name=self.name)
+            if not webhook:
+                webhook = await channel.create_webhook(name=self.name)
+            url = webhook.url
+        except discord.Forbidden:
+            logging.warning(f"Missing permissions to use webhooks in channel {channel.id}, using regular messages")
+        self.webhooks[channel.id] = url
+        return url
+
+    async def execute(self, url: str, embeds: list) -> bool:
+        """Posts the embeds through the webhook, returns False if the webhook doesn't exist anymore"""
+        payload = {
+            'username': self.bot.user.name,
+            'avatar_url': str(self.bot.user.avatar_url),
+            'embeds': [embed.to_dict() for embed in embeds],
+        }
+        while True:
+            self.stats['requests'] += 1
+            async with self.bot.http_client.post(url, json=payload, params={'wait': 'true'}) as r:
+                remaining = r.headers.get('X-RateLimit-Remaining')
+                reset_after = float(r.headers.get('X-RateLimit-Reset-After', 0))
+                if r.status == 429:
+                    self.stats['rate_limited'] += 1
+                    data = await r.json()
+                    # 'retry_after' is in milliseconds in the v6 API
+                    await asyncio.sleep(max(reset_after, data.get('retry_after', 1000) / 1000))
+                    continue
+                if r.status == 404:
+                    return False
+                r.raise_for_status()
+            if remaining == '0':
+                await asyncio.sleep(reset_after)
+            return True
+
+    async def close(self) -> None:
+        for worker in self.workers.values():
+            worker.cancel()
+
+    def __str__(self):
+        return (
+            f"{self.stats['embeds']} embeds em {self.stats['requests']} requests, "
+            f"{self.stats['rate_limited']} rate limits, {self.pending()} na fila"
+        )
+
+
+class OutboxPoster:
+    """
+    Same interface as WebhookPoster, used by the background worker: embeds are stored in the outbox table
+    instead, in the order they were queued, and the gateway process posts them (see the Outbox cog)
+    """
+
+    def __init__(self, bot: discord.Client, name: str):
+        self.bot = bot
+        self.name = name
+        self.queue: Deque[OutboxMessage] = collections.deque()
+        self.worker_task: Optional[asyncio.Task] = None
+        self.stats = collections.Counter(embeds=0, requests=0)
+
+    def post(self, channel: discord.abc.Snowflake, embed: discord.Embed) -> None:
+        self.queue.append(OutboxMessage(channel_id=channel.id, sender=self.name, payload=json.dumps(embed.to_dict())))
+        if not self.worker_task or self.worker_task.done():
+            self.worker_task = self.bot.loop.create_task(self.worker())
+
+    def pending(self) -> int:
+        return len(self.queue)
+
+    async def worker(self) -> None:
+        while self.queue:
+            messages = list(self.queue)
+            self.queue.clear()
+            try:
+                await self.bot.run_db(self.store, messages)
+                self.stats['embeds'] += len(messages)
+                self.stats['requests'] += 1
+            except Exception as e:
+                logging.error(f"Error storing {len(messages)} embeds in the outbox: {e}")
+
+    @staticmethod
+    def store(session, messages: list) -> None:
+        session.add_all(messages)
+
+    async def close(self) -> None:
+        if self.worker_task:
+            self.worker_task.cancel()
+
+    def __str__(self):
+        return f"{self.stats['embeds']} embeds enviados para a outbox, {self.pending()} na fila"
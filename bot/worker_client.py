@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+import discord
+
+from bot.bot_client import Bot
+from bot.utils.webhooks import OutboxPoster
+
+
+class Worker(Bot):
+    """
+    Runs the polling cogs listed in the 'worker_extensions' setting in a process of its own, without
+    connecting to Discord
+
+    Embeds are left in the outbox table instead of being posted, the bot's Outbox cog posts them. This keeps
+    the feed parsing and database work of the pollers off the event loop that handles commands.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loop.create_task(self.track_state())
+
+    async def track_state(self, interval: float = 60.0):
+        """Toggle commands run in the bot's process, so the worker re-reads the state rows every 'interval' seconds"""
+        while not self.is_closed():
+            await asyncio.sleep(interval)
+            await self.run_db(self.state.load)
+
+    def enabled_extensions(self):
+        return [cog for cog in self.setting.worker_extensions if cog not in self.setting.disabled_extensions]
+
+    async def wait_until_ready(self):
+        """There is no gateway connection to wait for"""
+        return
+
+    def get_channel(self, id: int):
+        return discord.Object(id=id)
+
+    def embed_poster(self, name: str):
+        return OutboxPoster(self, name)
+
+    async def send_logs(self, e, tb, ctx=None):
+        logging.error(f"{e}: {tb}")
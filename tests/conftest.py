@@ -0,0 +1,4 @@
+import os
+
+# bot.orm.db connects when it's imported, tests run against an in-memory database instead of the configured one
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
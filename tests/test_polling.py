@@ -0,0 +1,82 @@
+import bisect
+import collections
+import random
+import statistics
+
+from bot.utils.polling import PollScheduler
+
+
+DAY = 24 * 60 * 60
+# Same as the adv log: a pass every 15 seconds, at most 60 players polled per pass
+TICK = 15
+PLAYERS_PER_TICK = 60
+
+
+def activity_times(rng: random.Random, mean_interval: float, duration: float):
+    """Times of a player's new log entries, as a Poisson process with the given mean interval"""
+    times = []
+    now = rng.expovariate(1 / mean_interval)
+    while now < duration:
+        times.append(now)
+        now += rng.expovariate(1 / mean_interval)
+    return times
+
+
+def simulate(players: dict, duration: float):
+    """
+    Polls a clan with a PollScheduler for 'duration' seconds
+
+    'players' maps each player to the times their log gets new entries. Returns the number of polls of each
+    player and, for each entry, how long it took to be seen (None if it never was).
+    """
+    scheduler = PollScheduler()
+    scheduler.retain(players, 0)
+    last_polls = {player: 0.0 for player in players}
+    latencies = {player: [None] * len(times) for player, times in players.items()}
+    polls = collections.Counter()
+    now = 0.0
+    while now < duration:
+        for player in scheduler.due(now, limit=PLAYERS_PER_TICK):
+            polls[player] += 1
+            times = players[player]
+            start = bisect.bisect_right(times, last_polls[player])
+            end = bisect.bisect_right(times, now)
+            for index in range(start, end):
+                latencies[player][index] = now - times[index]
+            last_polls[player] = now
+            scheduler.record(player, now, active=end > start)
+        now += TICK
+    return polls, latencies
+
+
+def test_adaptive_polling():
+    random.seed(14)
+    rng = random.Random(14)
+    duration = 2 * DAY
+    # A 500 member clan: a few players active all day, some that play once or twice a day, most dormant
+    active = {f'active {n}': activity_times(rng, 10 * 60, duration) for n in range(50)}
+    casual = {f'casual {n}': activity_times(rng, 12 * 60 * 60, duration) for n in range(150)}
+    dormant = {f'dormant {n}': [] for n in range(300)}
+    players = {**active, **casual, **dormant}
+    polls, latencies = simulate(players, duration)
+
+    # Polling every member as often as the per-pass limit allows
+    fixed_rate_polls = PLAYERS_PER_TICK * duration / TICK
+    assert sum(polls.values()) < 0.12 * fixed_rate_polls
+
+    # An entry is seen at most the maximum interval (plus jitter) after it was published
+    scheduler = PollScheduler()
+    latest = scheduler.max_interval * (1 + scheduler.jitter) + TICK
+    for player, times in players.items():
+        for latency, time in zip(latencies[player], times):
+            if latency is None:
+                assert time > duration - latest
+            else:
+                assert latency <= latest
+
+    active_latencies = [latency for player in active for latency in latencies[player] if latency is not None]
+    assert statistics.median(active_latencies) < 3 * 60
+    assert sorted(active_latencies)[int(len(active_latencies) * 0.95)] < 15 * 60
+
+    # Players that don't play back off to the maximum interval, a few polls a day
+    assert max(polls[player] for player in dormant) <= 25
@@ -0,0 +1,73 @@
+import types
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip('discord')
+
+from bot.orm.models import Base, Team, Player  # noqa: E402
+from bot.utils.teams import Roster  # noqa: E402
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    session = factory()
+    team = Team(team_id='1', title='Raids', size=2)
+    session.add(team)
+    session.flush()
+    session.add_all([
+        Player(player_id=10, team=team.id, substitute=False, secondary=False),
+        Player(player_id=20, team=team.id, substitute=False, secondary=False),
+        Player(player_id=30, team=team.id, substitute=True, secondary=False),
+    ])
+    session.commit()
+    session.close()
+
+    factory.statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: factory.statements.append(statement.split()[0]))
+    return factory
+
+
+def test_join_queries(session_factory):
+    session = session_factory()
+    roster = Roster.load(session, '1')
+    assert not roster.in_team(40)
+    assert roster.is_full()
+    roster.add(types.SimpleNamespace(id=40), substitute=True, secondary=False, session=session)
+    assert roster.count == 2 and len(roster.substitutes) == 2
+    assert session_factory.statements == ['SELECT']
+
+    session.commit()
+    assert session_factory.statements == ['SELECT', 'INSERT']
+
+
+def test_leave_queries(session_factory):
+    session = session_factory()
+    roster = Roster.load(session, '1')
+    roster.remove(roster.player(30), session)
+    assert not roster.substitutes
+    assert session_factory.statements == ['SELECT']
+
+    session.commit()
+    assert session_factory.statements == ['SELECT', 'DELETE']
+
+
+def test_substitute_promotion_queries(session_factory):
+    session = session_factory()
+    roster = Roster.load(session, '1')
+    leaving = roster.player(10)
+    substitute = roster.first_substitute(exclude=10)
+    assert substitute.player_id == 30
+    roster.remove(leaving, session)
+    substitute.substitute = False
+    assert roster.count == 2 and not roster.substitutes
+    assert session_factory.statements == ['SELECT']
+
+    session.commit()
+    assert sorted(session_factory.statements) == ['DELETE', 'SELECT', 'UPDATE']